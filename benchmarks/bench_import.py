@@ -0,0 +1,68 @@
+"""Import time of the `resources` package, run in fresh interpreters.
+
+The benchmarks follow the asv conventions (`timeraw_*` returns the code timed in a new
+process) and the module can also be run directly from the repository root:
+
+    python -m benchmarks.bench_import
+
+which times each import and fails if an import loads any of its forbidden (heavy)
+dependencies, guarding the lazy loading of the package against regressions."""
+
+import os
+import sys
+import subprocess
+
+# code run in a fresh interpreter: modules that must not be loaded by it
+IMPORTS = {
+    'import resources': ['pandas', 'numpy', 'matplotlib', 'geopandas', 'shapely', 'scipy', 'statsmodels'],
+    'from resources import import_table': ['matplotlib', 'geopandas', 'shapely', 'scipy', 'statsmodels'],
+    'from resources import load_stations, StationPanel': ['matplotlib', 'geopandas', 'shapely', 'scipy', 'statsmodels'],
+    'from resources import Bootstrap': ['matplotlib', 'geopandas', 'shapely', 'scipy.stats', 'statsmodels'],
+    'from resources import read_heatspots_dataset': ['matplotlib', 'geopandas', 'shapely', 'scipy', 'statsmodels'],
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportSuite():
+    def timeraw_import_package(self):
+        return 'import resources'
+
+    def timeraw_import_table(self):
+        return 'from resources import import_table'
+
+    def timeraw_bootstrap(self):
+        return 'from resources import Bootstrap'
+
+    def timeraw_plotting(self):
+        return 'from resources import streamplot'
+
+
+def measure(code, repeat=5):
+    """Returns the best wall time of *code* in *repeat* fresh interpreters and the
+    modules it loaded among all of those in `IMPORTS`."""
+
+    watched = sorted(set().union(*IMPORTS.values()))
+    script = ('import sys, time\nt = time.perf_counter()\n%s\nt = time.perf_counter() - t\n'
+              'print(t)\nprint(" ".join(m for m in %r if m in sys.modules))')%(code, watched)
+    best, loaded = float('inf'), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+        lines = out.stdout.splitlines()
+        best = min(best, float(lines[0]))
+        loaded = lines[1].split() if len(lines) > 1 else []
+    return best, loaded
+
+
+def main():
+    failed = False
+    for code, forbidden in IMPORTS.items():
+        seconds, loaded = measure(code)
+        leaked = sorted(set(loaded) & set(forbidden))
+        failed = failed or bool(leaked)
+        print('%-55s%10.1f ms  %s'%(code, seconds * 1e3, 'loads ' + ', '.join(leaked) if leaked else 'ok'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
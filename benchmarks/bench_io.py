@@ -0,0 +1,79 @@
+"""Benchmarks of the readers of `resources.io` on synthetic files."""
+
+import io
+import shutil
+import tempfile
+from contextlib import redirect_stdout
+from resources.io import import_table, load_stations, read_heatspots_dataset, read_states_geometry, read_states
+from . import synthetic
+
+
+class ImportTable():
+    params = [273, 2000]
+    param_names = ['n_months']
+
+    def setup(self, n_months):
+        self.directory = tempfile.mkdtemp()
+        self.path = synthetic.station_csv(self.directory + '/station.csv', n_months=n_months)
+
+    def teardown(self, n_months):
+        shutil.rmtree(self.directory)
+
+    def time_import_table(self, n_months):
+        with redirect_stdout(io.StringIO()):
+            import_table(self.path, period=True)
+
+    def peakmem_import_table(self, n_months):
+        with redirect_stdout(io.StringIO()):
+            import_table(self.path, period=True)
+
+
+class LoadStations():
+    params = [45, 300]
+    param_names = ['n_stations']
+
+    def setup(self, n_stations):
+        self.directory = tempfile.mkdtemp()
+        synthetic.station_files(self.directory, n_stations=n_stations)
+
+    def teardown(self, n_stations):
+        shutil.rmtree(self.directory)
+
+    def time_load_stations(self, n_stations):
+        load_stations(self.directory + '/*.csv', workers=1)
+
+
+class Heatspots():
+    params = [20, 500]
+    param_names = ['n_years']
+
+    def setup(self, n_years):
+        self.directory = tempfile.mkdtemp()
+        self.path = synthetic.heatspots_tsv(self.directory + '/heatspots.csv', n_years=n_years)
+
+    def teardown(self, n_years):
+        shutil.rmtree(self.directory)
+
+    def time_read_heatspots_dataset(self, n_years):
+        read_heatspots_dataset(self.path)
+
+    def peakmem_read_heatspots_dataset(self, n_years):
+        read_heatspots_dataset(self.path)
+
+
+class StatesGeometry():
+    params = [500, 20000]
+    param_names = ['n_vertices']
+
+    def setup(self, n_vertices):
+        self.directory = tempfile.mkdtemp()
+        synthetic.state_geojsons(self.directory, n_vertices=n_vertices)
+
+    def teardown(self, n_vertices):
+        shutil.rmtree(self.directory)
+
+    def time_read_states_geometry(self, n_vertices):
+        read_states_geometry(self.directory + '/*.geojson')
+
+    def time_read_states(self, n_vertices):
+        read_states(self.directory + '/*.geojson', cache=None)
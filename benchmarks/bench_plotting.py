@@ -0,0 +1,48 @@
+"""Benchmarks of the main plots of `resources.plotting`, drawn with the Agg backend."""
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from resources import plotting
+from . import synthetic
+
+
+class Plots():
+    params = [45, 400]
+    param_names = ['n_series']
+
+    def setup(self, n_series):
+        self.df = synthetic.panel_frame(n_series=n_series)
+        rng = np.random.default_rng(0)
+        self.points = pd.DataFrame({'x': rng.normal(size=100 * n_series), 'y': rng.normal(size=100 * n_series),
+                                    'biome': rng.choice(['Amazonia', 'Cerrado', 'Caatinga', 'Pantanal'], 100 * n_series)})
+        self.clusters = self.df.T.iloc[:, :12].assign(cluster=rng.integers(0, 4, n_series))
+
+    def teardown(self, n_series):
+        plt.close('all')
+
+    def _draw(self, plot, *args, **kwargs):
+        fig, ax = plt.subplots()
+        plot(*args, ax=ax, **kwargs)
+        fig.canvas.draw()
+        plt.close(fig)
+
+    def time_streamplot(self, n_series):
+        self._draw(plotting.streamplot, self.df, interval='2sigma')
+
+    def time_streamplot_fast(self, n_series):
+        self._draw(plotting.streamplot, self.df, fast=True)
+
+    def time_parallelplot(self, n_series):
+        self._draw(plotting.parallelplot, self.clusters, 'cluster', alpha=.3)
+
+    def time_scatterplot(self, n_series):
+        self._draw(plotting.scatterplot, self.points, 'x', 'y', col='biome', legend=True)
+
+    def time_boxplot(self, n_series):
+        self._draw(plotting.boxplot, self.df.to_numpy(), patch_artist=True)
+
+    def time_autocorrplot(self, n_series):
+        self._draw(plotting.autocorrplot, self.df.iloc[:, 0])
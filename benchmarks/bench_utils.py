@@ -0,0 +1,60 @@
+"""Benchmarks of `resources.utils`: bootstrapping, peak months and feature collection."""
+
+import numpy as np
+from resources.utils import Bootstrap, ols_slope, get_peak_month, get_peak_months, collect_features
+from resources.panel import StationPanel
+from . import synthetic
+
+
+class BootstrapFeed():
+    params = (['iid', 'moving', 'stationary'], ['percentile', 'bca'])
+    param_names = ['method', 'interval']
+
+    def setup(self, method, interval):
+        df = synthetic.panel_frame(n_series=1)
+        self.x = np.arange(len(df), dtype=float)
+        self.y = df.iloc[:, 0].to_numpy()
+
+    def time_feed_mean(self, method, interval):
+        Bootstrap(np.mean, n_samples=2000, method=method).feed(self.y, interval=interval, seed=0)
+
+    def time_feed_ols_slope(self, method, interval):
+        Bootstrap(ols_slope, n_samples=2000, method=method).feed(self.x, self.y, interval=interval, seed=0)
+
+    def peakmem_feed_ols_slope(self, method, interval):
+        Bootstrap(ols_slope, n_samples=2000, method=method).feed(self.x, self.y, interval=interval, seed=0)
+
+
+class PeakMonth():
+    params = [27, 1000]
+    param_names = ['n_series']
+
+    def setup(self, n_series):
+        self.df = synthetic.panel_frame(n_series=n_series)
+
+    def time_get_peak_month(self, n_series):
+        get_peak_month(self.df, self.df.columns[0])
+
+    def time_get_peak_months(self, n_series):
+        get_peak_months(self.df)
+
+
+class CollectFeatures():
+    params = [45, 500]
+    param_names = ['n_stations']
+
+    def setup(self, n_stations):
+        df = synthetic.panel_frame(n_series=n_stations)
+        self.stations = [{'Code': code, 'Latitude': 0., 'Longitude': 0., 'Height': 0.,
+                          'Data': df[[code]].rename(columns={code: 'avgTemp'}).assign(precipitationTotal=df[code] ** 2)}
+                         for code in df.columns]
+        self.panel = StationPanel.from_stations(self.stations)
+
+    def time_collect_features_stations(self, n_stations):
+        collect_features(self.stations, 'avgTemp')
+
+    def time_collect_features_panel(self, n_stations):
+        collect_features(self.panel, 'avgTemp')
+
+    def time_panel_from_stations(self, n_stations):
+        StationPanel.from_stations(self.stations)
@@ -0,0 +1,127 @@
+"""Runs the benchmarks of this directory without asv, from the repository root:
+
+    python -m benchmarks.run [name filter] [--quick] [--repeat N] [--report FILE] [--compare FILE]
+
+The suites follow the asv conventions: classes with `params`/`param_names`, `setup` and
+`teardown`, and `time_*` (best wall time of *repeat* calls), `peakmem_*` (peak of memory
+allocated in a call, traced by tracemalloc) and `timeraw_*` (code timed in a fresh
+interpreter) methods. Results and library versions are written as JSON to the report,
+which `--compare` diffs against an earlier one (e.g. before a pandas upgrade)."""
+
+import os
+import json
+import time
+import argparse
+import warnings
+import platform
+import importlib
+import itertools
+import tracemalloc
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+LIBRARIES = ['numpy', 'pandas', 'scipy', 'geopandas', 'shapely', 'matplotlib', 'statsmodels']
+
+
+def discover(pattern=''):
+    """Yields (name, class) of the benchmark suites whose name contains *pattern*."""
+
+    for file in sorted(os.listdir(DIRECTORY)):
+        if file.startswith('bench_') and file.endswith('.py'):
+            module = importlib.import_module('benchmarks.' + file[:-3])
+            for name, obj in vars(module).items():
+                if isinstance(obj, type) and obj.__module__ == module.__name__:
+                    if any(pattern in '%s.%s.%s'%(file[:-3], name, method) for method in dir(obj)):
+                        yield '%s.%s'%(file[:-3], name), obj
+
+
+def run_suite(name, suite, pattern='', repeat=5, quick=False):
+    """Runs the benchmarks of a *suite* for each of its parameter combinations."""
+
+    params = getattr(suite, 'params', [])
+    if params and not isinstance(params, tuple):
+        params = (params,)
+    combinations = list(itertools.product(*params)) if params else [()]
+    if quick:
+        combinations = combinations[:1]
+    methods = [method for method in sorted(dir(suite)) if method.split('_')[0] in ('time', 'peakmem', 'timeraw')
+               and pattern in '%s.%s'%(name, method)]
+
+    for combination in combinations:
+        bench = suite()
+        if hasattr(bench, 'setup'):
+            bench.setup(*combination)
+        try:
+            for method in methods:
+                func = getattr(bench, method)
+                entry = {'benchmark': '%s.%s'%(name, method), 'params': dict(zip(getattr(suite, 'param_names', []), combination))}
+                if method.startswith('time_'):
+                    func(*combination)
+                    times = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        func(*combination)
+                        times.append(time.perf_counter() - start)
+                    entry['seconds'] = min(times)
+                elif method.startswith('peakmem_'):
+                    tracemalloc.start()
+                    func(*combination)
+                    entry['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    from .bench_import import measure
+                    entry['seconds'] = measure(func(*combination), repeat)[0]
+                yield entry
+        finally:
+            if hasattr(bench, 'teardown'):
+                bench.teardown(*combination)
+
+
+def versions():
+    out = {'python': platform.python_version()}
+    for library in LIBRARIES:
+        try:
+            out[library] = importlib.import_module(library).__version__
+        except ImportError:
+            out[library] = None
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('pattern', nargs='?', default='')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true', help='first parameter combination only')
+    parser.add_argument('--report', default='./data/cache/benchmarks.json')
+    parser.add_argument('--compare', default=None, help='earlier report to compare with')
+    args = parser.parse_args(argv)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as file:
+            previous = {(entry['benchmark'], json.dumps(entry['params'], sort_keys=True)): entry
+                        for entry in json.load(file)['results']}
+
+    # warnings of the libraries would only clutter the report
+    warnings.simplefilter('ignore')
+    results = []
+    for name, suite in discover(args.pattern):
+        for entry in run_suite(name, suite, args.pattern, args.repeat, args.quick):
+            results.append(entry)
+            key = 'seconds' if 'seconds' in entry else 'peak_bytes'
+            value = entry[key] * 1e3 if key == 'seconds' else entry[key] / 2**20
+            line = '%-60s%-40s%12.2f %s'%(entry['benchmark'], ','.join('%s=%s'%item for item in entry['params'].items()),
+                                          value, 'ms' if key == 'seconds' else 'MiB')
+            old = previous.get((entry['benchmark'], json.dumps(entry['params'], sort_keys=True)))
+            if old is not None and old.get(key):
+                line += '%10.2fx'%(entry[key] / old[key])
+            print(line, flush=True)
+
+    directory = os.path.dirname(args.report)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.report, 'w') as file:
+        json.dump({'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'versions': versions(), 'results': results}, file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Generators of synthetic inputs, in the formats of the project datasets, at any scale."""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from resources.io import _FEATURE_NAMES, _codes_map, _months_map
+
+# the header of the table of the INMET monthly station exports
+STATION_FIELDS = [field for field in _FEATURE_NAMES if field not in ('Data Medicao', 'Unnamed: 17')]
+
+def station_csv(path, code='82024', n_months=273, null_rate=.05, seed=0):
+    """Writes an INMET monthly station export of *n_months* records from January 1998,
+    with a fraction *null_rate* of null values, to the file *path*."""
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('1998-01-01', periods=n_months, freq='ME')
+    values = rng.gamma(4., 10., size=(n_months, len(STATION_FIELDS)))
+    text = np.char.replace(np.round(values, 6).astype(str), '.', ',')
+    text[rng.random(text.shape) < null_rate] = 'null'
+
+    header = ['Nome: SYNTHETIC %s'%code,
+              'Codigo Estacao: %s'%code,
+              'Latitude: %.8f'%rng.uniform(-15, 5),
+              'Longitude: %.8f'%rng.uniform(-73, -45),
+              'Altitude: %.2f'%rng.uniform(0, 900),
+              'Situacao: Operante',
+              'Data Inicial: %s'%dates[0].strftime('%Y-%m-01'),
+              'Data Final: %s'%dates[-1].strftime('%Y-%m-%d'),
+              'Periodicidade da Medicao: Mensal',
+              '',
+              'Data Medicao;' + ';'.join(STATION_FIELDS) + ';']
+    rows = [date + ';' + ';'.join(row) + ';' for date, row in zip(dates.strftime('%Y-%m-%d'), text)]
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(header + rows) + '\n')
+    return path
+
+def station_files(directory, n_stations=45, n_months=273, seed=0):
+    """Writes *n_stations* station exports in *directory*, named as the INMET ones."""
+
+    os.makedirs(directory, exist_ok=True)
+    return [station_csv(os.path.join(directory, 'dados_%d_M_1998-01-01_2020-09-29.csv'%(82000 + i)),
+                        code=str(82000 + i), n_months=n_months, seed=seed + i)
+            for i in range(n_stations)]
+
+def heatspots_tsv(path, n_years=20, n_states=27, seed=0):
+    """Writes a heatspots counting (INPE export) of *n_years* from 1998 for *n_states*
+    states to the tab separated file *path*, numbers above a thousand being written with
+    the `.` thousands separator."""
+
+    rng = np.random.default_rng(seed)
+    states = [name.title() for name in list(_codes_map())[:n_states]]
+    months = list(_months_map())
+    years = 1998 + np.arange(n_years)
+
+    grid = pd.MultiIndex.from_product([years, states, range(12)], names=['Year', 'State', 'Month']).to_frame(index=False)
+    numbers = rng.negative_binomial(1, 1e-3, len(grid))
+    data = pd.DataFrame({'Year': grid['Year'],
+                         'State': grid['State'],
+                         'Month': np.array(months)[grid['Month']],
+                         'Number': ['{:,}'.format(number).replace(',', '.') for number in numbers],
+                         'Period': ['01/%02d/%d'%(month + 1, year) for year, month in zip(grid['Year'], grid['Month'])]})
+    data.to_csv(path, sep='\t', index=False, encoding='utf-8')
+    return path
+
+def random_polygons(n, n_vertices=500, seed=0):
+    """Returns *n* random star-shaped polygons around Brazil as closed (n_vertices + 1) x 2
+    coordinate arrays."""
+
+    rng = np.random.default_rng(seed)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, size=(n, n_vertices)), axis=1)
+    radius = rng.uniform(1, 5, size=(n, 1)) * (1 + .3 * rng.random((n, n_vertices)))
+    centers = np.column_stack([rng.uniform(-73, -35, n), rng.uniform(-33, 5, n)])
+    rings = centers[:, None, :] + radius[..., None] * np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    return [np.vstack([ring, ring[:1]]) for ring in rings]
+
+def state_geojsons(directory, n=27, n_vertices=500, seed=0):
+    """Writes *n* state boundary files in *directory*, as the ones of `data/geojson`:
+    one closed LineString named after a state code per file."""
+
+    os.makedirs(directory, exist_ok=True)
+    codes = sorted(set(_codes_map().values()))
+    paths = []
+    for i, ring in enumerate(random_polygons(n, n_vertices, seed)):
+        name = codes[i] if i < len(codes) else 'S%d'%i
+        feature = {'type': 'Feature', 'properties': {'Name': name, 'Description': 'SYNTHETIC'},
+                   'geometry': {'type': 'LineString', 'coordinates': ring.tolist()}}
+        paths.append(os.path.join(directory, '%s.geojson'%name))
+        with open(paths[-1], 'w') as file:
+            json.dump({'type': 'FeatureCollection', 'features': [feature]}, file)
+    return paths
+
+def panel_frame(n_months=273, n_series=45, seed=0):
+    """Returns a DataFrame of *n_series* random seasonal series over *n_months* periods."""
+
+    rng = np.random.default_rng(seed)
+    index = pd.period_range('1998-01', periods=n_months, freq='M', name='Date')
+    season = 10 * np.sin(2 * np.pi * np.arange(n_months) / 12)[:, None]
+    values = season + rng.normal(size=(n_months, n_series)).cumsum(axis=0) * .3
+    return pd.DataFrame(values, index=index, columns=[str(82000 + i) for i in range(n_series)])
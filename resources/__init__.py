@@ -6,14 +6,80 @@ Below are decribed the modules and packages used in the notebooks of this projec
 Modules
 -----------
 
-polynomials:
-|   This module groups functions and classes for generating polynomials
-|   whether fitting data or directly ortogonal polynomials
-|   (Legendre polynomials).
+io:
+|   This module groups functions for reading the datasets (heatspots, deforestation,
+|   weather stations and geometries) of the project.
 
-plotter:
-|   This module groups functions for visualizations presented throughout the notebooks.
+store, panel, chunked:
+|   Persistent store of the imported weather stations, the in-memory panel
+|   (time x station x feature) of their records and its on-disk chunked counterpart.
 
-functk:
-|   This module exits outside this package and contains utilities functions.
-"""
\ No newline at end of file
+utils:
+|   This module groups utilities functions and the Bootstrap class.
+
+spatial, consistency, gaps:
+|   Assignment of points to states and biomes, checks of stations against their
+|   neighbours and the index of gaps in the records of the stations.
+
+correlation, decomposition:
+|   Batched auto/cross-correlations and seasonal-trend decompositions.
+
+clustering:
+|   Principal component analysis and the search of the number of clusters (KMeans).
+
+features:
+|   Monthly design matrix of weather, heatspots and deforestation per region and its
+|   memory-mapped store.
+
+plotting, report:
+|   This module groups functions for visualizations presented throughout the notebooks
+|   and the batch rendering of figures.
+
+profiling:
+|   Opt-in recording of the wall time and peak memory of calls to the main functions.
+
+The public functions and classes of the modules are also available at the package level,
+e.g. `resources.import_table`. They are imported on first use, so that importing the
+package does not load heavy dependencies (matplotlib, geopandas, statsmodels...) that a
+job may not need.
+"""
+import importlib
+
+_API = {
+    'io': ['read_heatspots_dataset', 'aggregate_heatspots', 'read_deforestation_dataset', 'import_table',
+           'load_stations', 'read_states_geometry', 'read_states', 'convert_to_number', 'dump_data', 'load_data'],
+    'store': ['StationStore'],
+    'panel': ['StationPanel'],
+    'utils': ['Bootstrap', 'ols_slope', 'collect_features', 'print_frequency', 'extract_locations', 'extract_fields',
+              'create_df_from_pca', 'summary_dataset', 'RunningSummary', 'get_peak_month', 'get_peak_months'],
+    'spatial': ['RegionIndex', 'assign_regions'],
+    'consistency': ['SpatialConsistency'],
+    'gaps': ['GapIndex'],
+    'correlation': ['acf', 'pacf', 'ccf', 'lagged_correlations'],
+    'decomposition': ['decompose'],
+    'plotting': ['streamplot', 'parallelplot', 'plot_nullvalues', 'decompositionplot', 'boxplot', 'scatterplot',
+                 'autocorrplot'],
+    'report': ['render_figures'],
+    'features': ['FeatureMatrix', 'FeatureStore', 'build_features'],
+    'profiling': [],
+    'chunked': ['ChunkedPanel'],
+    'clustering': ['fit_pca', 'transform_pca', 'kmeans_search'],
+}
+
+_MODULES = {name: module for module, names in _API.items() for name in names}
+
+__all__ = sorted(_MODULES) + sorted(_API)
+
+def __getattr__(name):
+    """Imports the module of *name* (a public function or class, or a module) on first use."""
+
+    if name in _API:
+        return importlib.import_module('.' + name, __name__)
+    if name in _MODULES:
+        value = getattr(importlib.import_module('.' + _MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module %r has no attribute %r"%(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,214 @@
+import os
+import json
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .panel import StationPanel
+
+class ChunkedPanel():
+    """This class keeps a station panel (time x station x feature) on disk as `.npy`
+    chunks of a block of times by a block of stations, so that panels larger than the
+    memory (e.g. hourly records of the whole network) are written one station at a time
+    and aggregated one block of times at a time."""
+
+    def __init__(self, path):
+        """Opens the chunked panel in the directory *path* (see `create`)."""
+
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as file:
+            meta = json.load(file)
+
+        stored = np.load(os.path.join(path, 'index.npy'))
+        if meta['freq'] is not None:
+            self.index = pd.PeriodIndex.from_ordinals(stored, freq=meta['freq'], name=meta['index_name'])
+        else:
+            self.index = pd.DatetimeIndex(stored, name=meta['index_name'])
+        self.codes = pd.Index(meta['codes'], name='Code')
+        self.features = pd.Index(meta['features'])
+        self.metadata = pd.DataFrame(meta['metadata'], index=self.codes)
+        self.chunks = tuple(meta['chunks'])
+        self.dtype = np.dtype(meta['dtype'])
+
+    @classmethod
+    def create(cls, path, index, metadata, features, chunks=(8760, 64), dtype=np.float32):
+        """Creates an empty (null) chunked panel in the directory *path* on the time
+        *index* for the stations of *metadata* (a DataFrame indexed by code with
+        `Latitude`, `Longitude` and `Height` columns) and the *features* given. *chunks*
+        is the number of times and of stations per chunk."""
+
+        os.makedirs(os.path.join(path, 'chunks'), exist_ok=True)
+        freq = index.freqstr if isinstance(index, pd.PeriodIndex) else None
+        np.save(os.path.join(path, 'index.npy'), index.asi8 if freq is not None else index.to_numpy(dtype='datetime64[ns]'))
+        meta = {'freq': freq, 'index_name': index.name, 'codes': [str(code) for code in metadata.index],
+                'features': list(features), 'chunks': list(chunks), 'dtype': np.dtype(dtype).str,
+                'metadata': {field: [None if pd.isna(value) else float(value) for value in metadata[field]]
+                             for field in ['Latitude', 'Longitude', 'Height']}}
+        with open(os.path.join(path, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+
+        panel = cls(path)
+        for i, j in np.ndindex(*panel.n_blocks):
+            times, stations = panel._block_slices(i, j)
+            chunk = np.lib.format.open_memmap(panel._chunk_file(i, j), mode='w+', dtype=dtype,
+                                              shape=(times.stop - times.start, stations.stop - stations.start, len(features)))
+            chunk[:] = np.nan
+            del chunk
+        return panel
+
+    @classmethod
+    def from_panel(cls, panel, path, chunks=(8760, 64), dtype=np.float32):
+        """Writes an in-memory StationPanel *panel* as a chunked panel in *path*."""
+
+        out = cls.create(path, panel.index, panel.metadata, panel.features, chunks, dtype)
+        for i, j in np.ndindex(*out.n_blocks):
+            times, stations = out._block_slices(i, j)
+            chunk = np.load(out._chunk_file(i, j), mmap_mode='r+')
+            chunk[:] = panel.values[times, stations]
+            chunk.flush()
+        return out
+
+    @property
+    def shape(self):
+        return (len(self.index), len(self.codes), len(self.features))
+
+    @property
+    def n_blocks(self):
+        return (-(-len(self.index) // self.chunks[0]), -(-len(self.codes) // self.chunks[1]))
+
+    def write(self, stations):
+        """Writes the records of *stations*, an iterable (e.g. a generator reading files
+        one by one) of station dictionaries as returned by `import_table`, into the chunks.
+        Records out of the time index or of unknown stations are ignored. Only one station
+        is held in memory at a time."""
+
+        for station in stations:
+            if 'Data' not in station or str(station['Code']) not in self.codes:
+                continue
+            j, column = divmod(self.codes.get_loc(str(station['Code'])), self.chunks[1])
+            frame = station['Data'].reindex(columns=self.features)
+            rows = self.index.get_indexer(frame.index)
+            found = rows >= 0
+            rows, values = rows[found], frame.to_numpy(dtype=self.dtype)[found]
+
+            blocks = rows // self.chunks[0]
+            for i in np.unique(blocks):
+                chunk = np.load(self._chunk_file(i, j), mmap_mode='r+')
+                chunk[rows[blocks == i] - i * self.chunks[0], column] = values[blocks == i]
+                chunk.flush()
+
+    def block(self, i):
+        """Returns the array time x station x feature of the *i*-th block of times."""
+
+        return np.concatenate([np.load(self._chunk_file(i, j)) for j in range(self.n_blocks[1])], axis=1)
+
+    def to_panel(self, start=None, end=None):
+        """Loads the times from *start* to *end* (all if None) as an in-memory StationPanel."""
+
+        rows = np.arange(len(self.index))[self.index.slice_indexer(start, end)]
+        blocks = np.unique(rows // self.chunks[0])
+        values = np.concatenate([self.block(i) for i in blocks])[rows - blocks[0] * self.chunks[0]] if len(rows) \
+            else np.empty((0,) + self.shape[1:], dtype=self.dtype)
+        return StationPanel(np.asfortranarray(values), self.index[rows], self.metadata, self.features)
+
+    def aggregate(self, groups=None, how='mean', weights=None, q=(.05, .5, .95), freq=None, level='State', workers=None):
+        """Aggregates the stations of each group, per time and feature, one block of times
+        at a time over *workers* processes (all cores if None, in-process if 1).
+
+        *groups* maps station codes to groups (by default the region of kind *level*
+        containing each station, see `spatial.assign_regions`). *how* is one of `mean`,
+        `sum`, `count` or `quantile` (the quantiles *q*, per time only). *weights* (a
+        Series by code) turns means and sums into weighted ones. *freq* (e.g. `M`) sums up
+        the times into periods first, for the additive aggregates; periods are combined
+        across blocks. Null records are ignored.
+
+        Returns a DataFrame time x (feature, group[, quantile])."""
+
+        assert how in ('mean', 'sum', 'count', 'quantile'), "Only mean, sum, count or quantile are valid."
+        assert how != 'quantile' or freq is None, "Quantiles are computed per time only."
+
+        if groups is None:
+            import geopandas as gpd
+            from .spatial import assign_regions
+            locations = gpd.GeoSeries(gpd.points_from_xy(self.metadata['Longitude'], self.metadata['Latitude']), index=self.codes)
+            groups = assign_regions(locations)[level]
+        codes, names = pd.factorize(pd.Series(groups).reindex(self.codes))
+        weights = np.ones(len(self.codes)) if weights is None else pd.Series(weights).reindex(self.codes).fillna(0).to_numpy(dtype=float)
+
+        if freq is not None:
+            index = self.index.asfreq(freq) if isinstance(self.index, pd.PeriodIndex) else self.index.to_period(freq)
+            period_codes, periods = pd.factorize(index, sort=True)
+        else:
+            period_codes, periods = np.arange(len(self.index)), self.index
+
+        tasks = [(self.path, i, self.n_blocks[1], how, codes, len(names), weights, tuple(np.atleast_1d(q)),
+                  period_codes[i * self.chunks[0]:(i + 1) * self.chunks[0]])
+                 for i in range(self.n_blocks[0])]
+        if workers == 1:
+            results = [_aggregate_block(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_aggregate_block, *zip(*tasks)))
+
+        if how == 'quantile':
+            values = np.concatenate(results)
+            columns = pd.MultiIndex.from_product([self.features, names, np.atleast_1d(q)], names=['Feature', 'Group', 'Quantile'])
+            out_index = self.index
+        else:
+            sums = np.zeros((len(periods), len(names), len(self.features)))
+            counts = np.zeros_like(sums)
+            for ids, block_sums, block_counts in results:
+                sums[ids] += block_sums
+                counts[ids] += block_counts
+            values = {'sum': sums, 'count': counts}.get(how)
+            if how == 'mean':
+                values = np.where(counts > 0, sums / np.where(counts > 0, counts, 1), np.nan)
+            columns = pd.MultiIndex.from_product([self.features, names], names=['Feature', 'Group'])
+            out_index = periods
+
+        # time x group x feature (x quantile) -> time x (feature, group[, quantile])
+        values = np.moveaxis(values, 2, 1).reshape(len(out_index), -1)
+        return pd.DataFrame(values, index=out_index, columns=columns)
+
+    def _block_slices(self, i, j):
+        return (slice(i * self.chunks[0], min((i + 1) * self.chunks[0], len(self.index))),
+                slice(j * self.chunks[1], min((j + 1) * self.chunks[1], len(self.codes))))
+
+    def _chunk_file(self, i, j):
+        return os.path.join(self.path, 'chunks', '%d_%d.npy'%(i, j))
+
+
+def _aggregate_block(path, i, n_station_blocks, how, codes, n_groups, weights, q, period_codes):
+    """Worker task for `ChunkedPanel.aggregate`: aggregates the *i*-th block of times,
+    reading its chunks memory-mapped one block of stations at a time (all the stations
+    of the block of times for quantiles). Additive aggregates are summed up by the
+    *period_codes* of the times and returned with the periods they belong to."""
+
+    chunks = [np.load(os.path.join(path, 'chunks', '%d_%d.npy'%(i, j)), mmap_mode='r') for j in range(n_station_blocks)]
+
+    if how == 'quantile':
+        values = np.concatenate(chunks, axis=1)
+        out = np.full((len(values), n_groups, values.shape[2], len(q)), np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for g in range(n_groups):
+                members = np.flatnonzero(codes == g)
+                if len(members):
+                    out[:, g] = np.moveaxis(np.nanquantile(values[:, members], q, axis=1), 0, -1)
+        return out
+
+    sums = counts = 0
+    start = 0
+    for chunk in chunks:
+        stop = start + chunk.shape[1]
+        member = codes[start:stop]
+        matrix = np.zeros((stop - start, n_groups))
+        matrix[np.flatnonzero(member >= 0), member[member >= 0]] = weights[start:stop][member >= 0]
+
+        valid = ~np.isnan(chunk)
+        sums = sums + np.einsum('tsf,sg->tgf', np.where(valid, chunk, 0), matrix)
+        counts = counts + np.einsum('tsf,sg->tgf', valid, matrix)
+        start = stop
+
+    ids, bounds = np.unique(period_codes, return_index=True)
+    return ids, np.add.reduceat(sums, bounds, axis=0), np.add.reduceat(counts, bounds, axis=0)
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .utils import create_df_from_pca
+
+def fit_pca(data, n_components=None, solver='auto', batch_size=None, random_state=None, **kwargs):
+    """Fits a principal component analysis to *data* (samples x variables) once, so that
+    `transform_pca` projects any data on as many components as needed afterwards.
+    *solver* is passed to sklearn PCA (e.g. `randomized` for large panels when
+    *n_components* is small) or, if `incremental`, an IncrementalPCA is fitted on
+    batches of *batch_size* samples, keeping memory bounded."""
+
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    if solver == 'incremental':
+        model = IncrementalPCA(n_components=n_components, batch_size=batch_size, **kwargs)
+    else:
+        model = PCA(n_components=n_components, svd_solver=solver, random_state=random_state, **kwargs)
+    return model.fit(np.asarray(data, dtype=float))
+
+def transform_pca(model, data, n_components=None):
+    """Returns the coefficients of the first *n_components* (all if None) of *data* as a
+    DataFrame (see `utils.create_df_from_pca`) indexed as *data*."""
+
+    coeffs = create_df_from_pca(model, data, n_components)
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        coeffs.index = data.index
+    return coeffs
+
+def kmeans_search(data, k_range=range(2, 11), sample_size=10000, workers=None, random_state=0, **kwargs):
+    """Elbow and silhouette search of the number of clusters of *data*: KMeans is fitted
+    for each k of *k_range* over a pool of *workers* processes (all cores if None,
+    in-process if 1), each one using a single thread. The silhouette is scored on a
+    random sample of *sample_size* points (all if None), keeping the search
+    sub-quadratic on large data. *kwargs* are passed to sklearn KMeans.
+
+    Returns a DataFrame indexed by k with the `inertia` and `silhouette` of each fit."""
+
+    data = np.asarray(data, dtype=float)
+    k_range = list(k_range)
+    tasks = [(data, k, sample_size, random_state, kwargs) for k in k_range]
+
+    if workers == 1:
+        results = [_fit_kmeans(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fit_kmeans, *zip(*tasks)))
+
+    return pd.DataFrame(results, index=pd.Index(k_range, name='k'), columns=['inertia', 'silhouette'])
+
+def _fit_kmeans(data, k, sample_size, random_state, kwargs):
+    """Worker task for `kmeans_search`: returns the inertia and sampled silhouette."""
+
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+    from threadpoolctl import threadpool_limits
+
+    with threadpool_limits(1):
+        model = KMeans(n_clusters=k, random_state=random_state, **kwargs).fit(data)
+        if sample_size is not None and sample_size >= len(data):
+            sample_size = None
+        silhouette = silhouette_score(data, model.labels_, sample_size=sample_size, random_state=random_state)
+    return model.inertia_, silhouette
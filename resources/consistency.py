@@ -0,0 +1,110 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from .panel import StationPanel
+from .utils import extract_locations
+
+class SpatialConsistency():
+    """This class checks the records of each station against those of its nearest
+    neighbours: per period and feature, the deviation of a station from the median of its
+    neighbours is scored against the usual (robust) spread of that deviation, so that
+    systematic differences such as those due to altitude are not flagged."""
+
+    def __init__(self, locations, k=5, crs=5880, min_neighbors=2):
+        """*locations* is a GeoSeries of station Points (lon/lat, e.g. from
+        `extract_locations`) indexed by code, projected to *crs* (default SIRGAS 2000 /
+        Brazil Polyconic) to find the *k* nearest neighbours of each station. Medians
+        of less than *min_neighbors* valid neighbour records are null."""
+
+        if locations.crs is None:
+            locations = locations.set_crs(4326)
+        projected = locations.to_crs(crs)
+        xy = np.column_stack([projected.x.to_numpy(), projected.y.to_numpy()])
+        k = min(k, len(xy) - 1)
+
+        self.codes = locations.index
+        self.tree = cKDTree(xy)
+        distances, neighbors = self.tree.query(xy, k=k + 1)
+        # the nearest point of each station is itself
+        self.neighbors, self.distances = neighbors[:, 1:], distances[:, 1:]
+        self.min_neighbors = min_neighbors
+        self.center, self.scale, self.features = None, None, None
+
+    @classmethod
+    def from_panel(cls, panel, k=5, **kwargs):
+        """Builds the checker on the stations of *panel* (a StationPanel or a list of
+        station dictionaries) and fits it to their records, see `fit`."""
+
+        if not isinstance(panel, StationPanel):
+            panel = StationPanel.from_stations(panel)
+        return cls(extract_locations(panel, primary_key='Code'), k=k, **kwargs).fit(panel)
+
+    def neighbor_median(self, values):
+        """Returns the median of the neighbours of each station in *values*, an array
+        (time x) station x feature, ignoring nulls."""
+
+        gathered = values[..., self.neighbors, :]
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            median = np.nanmedian(gathered, axis=-2)
+        enough = (~np.isnan(gathered)).sum(axis=-2) >= self.min_neighbors
+        return np.where(enough, median, np.nan)
+
+    def fit(self, panel):
+        """Keeps, per station and feature of *panel*, the median (center) and the scaled
+        median absolute deviation (scale) over time of the deviations of the station from
+        its neighbours. Returns the checker itself."""
+
+        values = self._values(panel)
+        deviations = values - self.neighbor_median(values)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.center = np.nanmedian(deviations, axis=0)
+            scale = 1.4826 * np.nanmedian(np.abs(deviations - self.center), axis=0)
+        self.scale = np.where(scale > 0, scale, np.nan)
+        self.features = pd.Index(panel.features)
+        return self
+
+    def scores(self, values, median=None):
+        """Robust z-scores of *values*, an array (time x) station x feature ordered as
+        the fitted panel, of the deviations of each station from its neighbours. *median*
+        is the neighbour median of *values*, if already computed."""
+
+        assert self.scale is not None, "The checker must be fitted first."
+        if median is None:
+            median = self.neighbor_median(values)
+        deviations = values - median
+        return (deviations - self.center) / self.scale
+
+    def check(self, panel, threshold=3.5):
+        """Flags the records of *panel* whose score is beyond *threshold* in absolute
+        value. Returns a DataFrame with a row per flagged record: time, code, feature,
+        value, neighbour median and score."""
+
+        values = self._values(panel)
+        median = self.neighbor_median(values)
+        scores = self.scores(values, median)
+        t, s, f = np.nonzero(np.abs(np.nan_to_num(scores)) > threshold)
+
+        return pd.DataFrame({panel.index.name or 'Date': panel.index[t],
+                             'Code': self.codes[s],
+                             'Feature': self.features[f],
+                             'Value': values[t, s, f],
+                             'NeighborMedian': median[t, s, f],
+                             'Score': scores[t, s, f]})
+
+    def check_month(self, records, threshold=3.5):
+        """Incremental check of a single new period: *records* is a DataFrame station x
+        feature (missing stations or features being null) scored with the center and
+        scale fitted before. Returns a DataFrame of scores alike and one of flags."""
+
+        records = records.reindex(index=self.codes, columns=self.features)
+        scores = pd.DataFrame(self.scores(records.to_numpy(dtype=float)), index=records.index, columns=records.columns)
+        return scores, scores.abs() > threshold
+
+    def _values(self, panel):
+        assert panel.codes.equals(self.codes), "The panel must hold the stations of the checker, in the same order."
+        if self.features is None or panel.features.equals(self.features):
+            return panel.values
+        return panel.values[:, :, panel.features.get_indexer(self.features)]
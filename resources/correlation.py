@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from scipy.fft import rfft, irfft, next_fast_len
+
+def acf(x, nlags=None, adjusted=False):
+    """Autocorrelation of *x*, a series or a 2-D array/DataFrame time x series, for lags
+    0 to *nlags* (`None` or `auto` as in statsmodels) computed for all series at once
+    through FFT. Nulls are skipped: means use the valid values only and each lag sums the
+    valid pairs, divided by the number of valid values or, if *adjusted*, of pairs.
+    Returns an array (lags,) or (lags, series), a DataFrame for DataFrame inputs."""
+
+    values, wrap = _as_2d(x)
+    nlags = _default_nlags(values, nlags)
+    acov = _xcov(values, values, nlags, adjusted)
+    return wrap(acov / acov[:1])
+
+def pacf(x, nlags=None):
+    """Partial autocorrelation of *x* (see `acf`) for lags 0 to *nlags*, obtained from the
+    autocorrelations by the Durbin-Levinson recursion (statsmodels' `ldb` method)
+    vectorized over the series."""
+
+    values, wrap = _as_2d(x)
+    nlags = _default_nlags(values, nlags)
+    r = _xcov(values, values, nlags, False)
+    r = r / r[:1]
+
+    out = np.ones_like(r)
+    phi = np.zeros((nlags + 1, r.shape[1]))
+    sigma = np.ones(r.shape[1])
+    for k in range(1, nlags + 1):
+        a = (r[k] - (phi[1:k] * r[k-1:0:-1]).sum(axis=0)) / sigma
+        phi[1:k] = phi[1:k] - a * phi[k-1:0:-1]
+        phi[k] = a
+        sigma = sigma * (1 - a**2)
+        out[k] = a
+    return wrap(out)
+
+def ccf(x, y, nlags=None, adjusted=True):
+    """Cross-correlation between the columns of *x* and *y* (or a single series *y*) as
+    corr(x[t+k], y[t]) for lags k = 0 to *nlags*, the same convention as statsmodels
+    `ccf`; i.e. positive lags are *y* leading *x*. Nulls are handled as in `acf`."""
+
+    xs, wrap = _as_2d(x)
+    ys, _ = _as_2d(y)
+    if ys.shape[1] == 1:
+        ys = np.repeat(ys, xs.shape[1], axis=1)
+    nlags = _default_nlags(xs, nlags)
+
+    xcov = _xcov(xs, ys, nlags, adjusted)
+    std_x = np.sqrt(_xcov(xs, xs, 0, False)[0])
+    std_y = np.sqrt(_xcov(ys, ys, 0, False)[0])
+    return wrap(xcov / (std_x * std_y))
+
+def lagged_correlations(df, target, nlags=12):
+    """Screening helper: DataFrame lags x columns of *df* with the correlation between
+    *target* (a series, or a DataFrame with the same columns as *df*) and each column of
+    *df* lagged by 0 to *nlags* periods, i.e. how each column leads the target."""
+
+    target = target.reindex(df.index)
+    if isinstance(target, pd.DataFrame):
+        target = target[df.columns]
+    out = ccf(target.to_numpy(dtype=float) if isinstance(target, pd.DataFrame) else target.to_numpy(dtype=float)[:, None],
+              df.to_numpy(dtype=float), nlags=nlags)
+    return pd.DataFrame(out, index=pd.RangeIndex(nlags + 1, name='Lag'), columns=df.columns)
+
+def _xcov(x, y, nlags, adjusted):
+    """Sums of x[t+k] * y[t] over the valid pairs for k = 0 to *nlags* of demeaned,
+    zero-filled columns, divided by the number of valid values (or pairs if *adjusted*)."""
+
+    same = x is y
+    mask_x, mask_y = ~np.isnan(x), ~np.isnan(y)
+    x = np.where(mask_x, x - np.nanmean(x, axis=0), 0)
+    y = x if same else np.where(mask_y, y - np.nanmean(y, axis=0), 0)
+
+    size = next_fast_len(2 * len(x) - 1)
+    sums = _xcorr(x, y, size, nlags, same)
+    if adjusted:
+        pairs = _xcorr(mask_x.astype(float), mask_y.astype(float), size, nlags, same)
+        return sums / np.maximum(np.round(pairs), 1)
+    return sums / (mask_x & mask_y).sum(axis=0)
+
+def _xcorr(x, y, size, nlags, same=False):
+    """Circular cross-correlation through FFT of zero-padded (to *size*) columns."""
+
+    fx = rfft(x, size, axis=0, workers=-1)
+    fy = fx if same else rfft(y, size, axis=0, workers=-1)
+    return irfft(fx * np.conj(fy), size, axis=0, workers=-1)[:nlags + 1]
+
+def _as_2d(x):
+    """Returns *x* as a float array time x series and a function shaping results back."""
+
+    if isinstance(x, pd.DataFrame):
+        columns = x.columns
+        return x.to_numpy(dtype=float), lambda out: pd.DataFrame(out, index=pd.RangeIndex(len(out), name='Lag'), columns=columns)
+
+    values = np.asarray(x, dtype=float)
+    if values.ndim == 1:
+        return values[:, None], lambda out: out[:, 0]
+    return values, lambda out: out
+
+def _default_nlags(values, nlags):
+    if nlags is None or nlags == 'auto':
+        return min(int(10 * np.log10(len(values))), len(values) - 1)
+    return nlags
@@ -0,0 +1,80 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.seasonal import STL
+from .panel import StationPanel
+
+COMPONENTS = ['observed', 'trend', 'seasonal', 'resid']
+
+def decompose(data, period=12, workers=None, cache='./data/cache/stl', **kwargs):
+    """Fits a seasonal-trend decomposition (STL) to every series in *data*, a DataFrame
+    with one series per column (columns may be a MultiIndex, e.g. feature x state) or a
+    StationPanel (all features x stations). *kwargs* are passed to statsmodels STL.
+
+    Leading and trailing nulls are dropped and gaps interpolated; series shorter than two
+    periods are skipped. Fits are spread over *workers* processes (all cores if None,
+    in-process if 1) and kept in the directory *cache* (if not None) under a hash of the
+    series and parameters, so that only new or changed series are fitted again.
+
+    Returns a tidy DataFrame indexed by series and time with the columns `observed`,
+    `trend`, `seasonal` and `resid`; the rows of one series (e.g. `result.loc['AM']`)
+    can be passed straight to `plotting.decompositionplot`."""
+
+    if isinstance(data, StationPanel):
+        data = pd.concat({feature: data.feature(feature) for feature in data.features}, axis=1,
+                         names=['Feature', data.codes.name])
+
+    params = dict(kwargs, period=period)
+    series = {}
+    for key in data.columns:
+        s = data[key].dropna()
+        if len(s) < 2 * period:
+            continue
+        s = data[key].loc[s.index[0]: s.index[-1]].interpolate()
+        series[key] = (s, _series_hash(s, params))
+
+    results = {}
+    pending = []
+    for key, (s, digest) in series.items():
+        file = os.path.join(cache, digest + '.npy') if cache is not None else None
+        if file is not None and os.path.exists(file):
+            results[key] = np.load(file)
+        else:
+            pending.append(key)
+
+    tasks = [series[key][0].to_numpy(dtype=float) for key in pending]
+    if workers == 1:
+        fitted = [_fit_stl(values, params) for values in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fitted = list(executor.map(_fit_stl, tasks, [params] * len(tasks)))
+
+    if cache is not None:
+        os.makedirs(cache, exist_ok=True)
+    for key, components in zip(pending, fitted):
+        results[key] = components
+        if cache is not None:
+            np.save(os.path.join(cache, series[key][1] + '.npy'), components)
+
+    names = list(data.columns.names) if data.columns.nlevels > 1 else [data.columns.name or 'Series']
+    frames = {key: pd.DataFrame(np.vstack([series[key][0].to_numpy(dtype=float), results[key]]).T,
+                                index=series[key][0].index, columns=COMPONENTS)
+              for key in series}
+    if not frames:
+        return pd.DataFrame(columns=COMPONENTS)
+    return pd.concat(frames, names=names + [data.index.name or 'Date'])
+
+def _fit_stl(values, params):
+    """Worker task for `decompose`: returns the trend, seasonal and resid of *values*."""
+
+    result = STL(values, **params).fit()
+    return np.vstack([result.trend, result.seasonal, result.resid])
+
+def _series_hash(series, params):
+    """Hash of the values and index of *series* together with the STL parameters."""
+
+    digest = hashlib.sha1(pd.util.hash_pandas_object(series).to_numpy().tobytes())
+    digest.update(repr(sorted(params.items())).encode())
+    return digest.hexdigest()
@@ -0,0 +1,235 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from .panel import StationPanel
+from .io import _codes_map
+
+# (feature, function, window in months) of the default rolling features
+WINDOWS = [('precipitationTotal', 'sum', 3), ('precipitationTotal', 'sum', 6)]
+
+# differences of features (minuend, subtrahend) added to the weather features if available
+DIFFERENCES = {'deltaTemp': ('avgMaxTemp', 'avgMinTemp')}
+
+class FeatureMatrix():
+    """This class holds the monthly design matrix as an array of shape time x region x
+    feature (C order), so that the rows (month, region) are a 2-D view of it."""
+
+    def __init__(self, values, index, regions, features):
+        self.values = values
+        self.index = index
+        self.regions = pd.Index(regions, name='Region')
+        self.features = pd.Index(features)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def feature(self, name):
+        """Returns a DataFrame month x region of feature *name* (a view on the matrix)."""
+
+        return pd.DataFrame(self.values[:, :, self.features.get_loc(name)], index=self.index, columns=self.regions, copy=False)
+
+    def region(self, name):
+        """Returns a DataFrame month x feature with the records of region *name*."""
+
+        return pd.DataFrame(self.values[:, self.regions.get_loc(name), :], index=self.index, columns=self.features, copy=False)
+
+    def design_matrix(self):
+        """Returns a DataFrame (month, region) x feature without copying the values."""
+
+        index = pd.MultiIndex.from_product([self.index, self.regions])
+        return pd.DataFrame(self.values.reshape(-1, len(self.features)), index=index, columns=self.features, copy=False)
+
+
+def build_features(panel=None, heatspots=None, deforestation=None, level='State', stations=None, regions=None,
+                   lags=(), windows=WINDOWS):
+    """Aligns on a shared monthly index, per region (`State` or `Biome` as *level*):
+        - the mean over the stations of each region of the records of *panel* (a
+          StationPanel or a list of station dictionaries), plus the `DIFFERENCES`;
+        - the *heatspots* countings (`heatspots` feature), either the output of
+          `read_heatspots_dataset` or a wide DataFrame month x state code as returned by
+          `aggregate_heatspots`;
+        - the yearly *deforestation* areas (`deforestation` feature) of
+          `read_deforestation_dataset`, repeated over the months of each year.
+    *stations* maps station codes to regions (by default assigned from the locations of
+    the stations) and *regions* restricts the regions (all found if None). Then adds the
+    features lagged by *lags*, a list of (feature, months), and the rolling *windows*,
+    a list of (feature, `sum` or `mean`, months). Returns a FeatureMatrix."""
+
+    base, index, regions = _align_sources(panel, heatspots, deforestation, level, stations, regions)
+    features = list(base)
+    values = np.stack([base[name].to_numpy(dtype=float) for name in features], axis=-1) if features \
+        else np.empty((len(index), len(regions), 0))
+    derived, derived_names = _derive(values, features, lags, windows)
+    return FeatureMatrix(np.ascontiguousarray(np.concatenate([values, derived], axis=-1)), index, regions,
+                         features + derived_names)
+
+class FeatureStore():
+    """This class persists a FeatureMatrix under the directory *path* as a raw array
+    (`values.dat`) described by `meta.json`, which training jobs load memory-mapped
+    without copying. New months are written over the trailing rows or appended."""
+
+    def __init__(self, path='./data/features'):
+        self.path = path
+
+    @property
+    def meta(self):
+        with open(os.path.join(self.path, 'meta.json')) as file:
+            return json.load(file)
+
+    def build(self, panel=None, heatspots=None, deforestation=None, level='State', stations=None, regions=None,
+              lags=(), windows=WINDOWS):
+        """Builds the matrix from the sources (see `build_features`) and writes it."""
+
+        matrix = build_features(panel, heatspots, deforestation, level, stations, regions, lags, windows)
+        n_base = len(matrix.features) - len(lags) - len(windows)
+        os.makedirs(self.path, exist_ok=True)
+        matrix.values.astype(np.float64).tofile(os.path.join(self.path, 'values.dat'))
+        self._write_meta({'start': str(matrix.index[0]), 'length': len(matrix.index), 'level': level,
+                          'regions': list(matrix.regions), 'features': list(matrix.features),
+                          'base': list(matrix.features[:n_base]),
+                          'stations': None if stations is None else dict(pd.Series(stations)),
+                          'lags': [list(lag) for lag in lags], 'windows': [list(window) for window in windows]})
+        return self.load()
+
+    def load(self, mode='r'):
+        """Returns the stored FeatureMatrix, its values memory-mapped in *mode*."""
+
+        meta = self.meta
+        shape = (meta['length'], len(meta['regions']), len(meta['features']))
+        values = np.memmap(os.path.join(self.path, 'values.dat'), dtype=np.float64, mode=mode, shape=shape) \
+            if shape[0] else np.empty(shape)
+        index = pd.period_range(meta['start'], periods=meta['length'], freq='M', name='Date')
+        return FeatureMatrix(values, index, meta['regions'], meta['features'])
+
+    def append(self, panel=None, heatspots=None, deforestation=None):
+        """Updates the store with the new months of the sources: the months from the first
+        one found in them on are computed again, using the stored months before as the
+        context of the lags and windows, and written over the trailing rows or appended.
+        Regions and features are those of the stored matrix. Returns the new matrix."""
+
+        meta = self.meta
+        base, index, _ = _align_sources(panel, heatspots, deforestation, meta['level'], meta['stations'], meta['regions'])
+        base_features = meta['base']
+        new = np.stack([base[name].to_numpy(dtype=float) if name in base else np.full((len(index), len(meta['regions'])), np.nan)
+                        for name in base_features], axis=-1)
+
+        stored = self.load()
+        offset, n = (index[0] - stored.index[0]).n, len(stored.index)
+        assert offset >= 0, "New months must not be earlier than the stored ones."
+        # the stored months before the new ones as context of the lags and windows, and
+        # empty months filling any gap between them
+        depth = max([lag for _, lag in meta['lags']] + [window - 1 for _, _, window in meta['windows']] + [0])
+        keep = min(offset, n)
+        first = max(0, keep - depth)
+        context = np.full((offset - first, len(meta['regions']), len(base_features)), np.nan)
+        context[:keep - first] = stored.values[first:keep, :, :len(base_features)]
+        del stored
+
+        values = np.concatenate([context, new])
+        derived, _ = _derive(values, base_features, meta['lags'], meta['windows'])
+        rows = np.concatenate([values, derived], axis=-1)[keep - first:]
+
+        row_size = len(meta['regions']) * len(meta['features']) * 8
+        with open(os.path.join(self.path, 'values.dat'), 'r+b') as file:
+            file.seek(keep * row_size)
+            file.write(rows.astype(np.float64).tobytes())
+        meta['length'] = max(n, keep + len(rows))
+        self._write_meta(meta)
+        return self.load()
+
+    def _write_meta(self, meta):
+        file = os.path.join(self.path, 'meta.json')
+        with open(file + '.tmp', 'w') as out:
+            json.dump(meta, out, indent=1)
+        os.replace(file + '.tmp', file)
+
+
+def _align_sources(panel, heatspots, deforestation, level, stations, regions):
+    """Returns a dictionary of DataFrames month x region, one per base feature, on the
+    monthly index covering all the sources, along with the index and the regions."""
+
+    frames = {}
+    if panel is not None:
+        frames.update(_regional_weather(panel, level, stations))
+    if heatspots is not None or deforestation is not None:
+        assert level == 'State', "Heatspots and deforestation are only available per state."
+    if heatspots is not None:
+        if 'Number' in heatspots.columns:
+            heatspots = heatspots.reset_index().pivot_table(index='Date', columns='St_codes', values='Number',
+                                                            aggfunc='sum', observed=True)
+        frames['heatspots'] = heatspots.set_axis(pd.PeriodIndex(heatspots.index, freq='M', name='Date')).astype(float)
+    if deforestation is not None:
+        codes_map = _codes_map()
+        frames['deforestation'] = deforestation.assign(St_codes=deforestation['State'].str.upper().map(codes_map)) \
+            .pivot_table(index='Year', columns='St_codes', values='Area', aggfunc='sum')
+
+    monthly = [frame.index for name, frame in frames.items() if name != 'deforestation']
+    if monthly:
+        index = pd.period_range(min(idx.min() for idx in monthly), max(idx.max() for idx in monthly), freq='M', name='Date')
+    else:
+        years = frames['deforestation'].index
+        index = pd.period_range('%d-01'%years.min(), '%d-12'%years.max(), freq='M', name='Date')
+
+    if regions is None:
+        regions = sorted(set().union(*(frame.columns for frame in frames.values())))
+    regions = pd.Index(regions, name='Region')
+
+    base = {}
+    for name, frame in frames.items():
+        if name == 'deforestation':
+            frame = frame.reindex(index.year).set_axis(index)
+        base[name] = frame.reindex(index=index, columns=regions)
+    return base, index, regions
+
+def _regional_weather(panel, level, stations):
+    """Means over the stations of each region of every feature of *panel* through one
+    product of the zero-filled records and valid counts with the station x region matrix."""
+
+    if not isinstance(panel, StationPanel):
+        panel = StationPanel.from_stations(panel)
+    if stations is None:
+        from .spatial import assign_regions
+        stations = assign_regions(panel.locations)[level]
+    stations = pd.Series(stations).reindex(panel.codes)
+
+    codes, regions = pd.factorize(stations)
+    weights = np.zeros((len(panel.codes), len(regions)))
+    weights[np.flatnonzero(codes >= 0), codes[codes >= 0]] = 1
+
+    valid = ~np.isnan(panel.values)
+    sums = np.einsum('tsf,sr->trf', np.where(valid, panel.values, 0), weights)
+    counts = np.einsum('tsf,sr->trf', valid.astype(float), weights)
+    means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    index = panel.index if isinstance(panel.index, pd.PeriodIndex) else panel.index.to_period('M')
+    frames = {name: pd.DataFrame(means[:, :, k], index=index, columns=regions) for k, name in enumerate(panel.features)}
+    for name, (minuend, subtrahend) in DIFFERENCES.items():
+        if minuend in frames and subtrahend in frames:
+            frames[name] = frames[minuend] - frames[subtrahend]
+    return frames
+
+def _derive(values, features, lags, windows):
+    """Lagged and rolling features of *values* (time x region x feature) computed on
+    strided views along time. Rolling windows are null until the window is complete."""
+
+    out, names = [], []
+    for name, lag in lags:
+        column = np.full(values.shape[:2], np.nan)
+        column[lag:] = values[:len(values) - lag, :, features.index(name)]
+        out.append(column)
+        names.append('%s_lag%d'%(name, lag))
+
+    for name, func, window in windows:
+        column = np.full(values.shape[:2], np.nan)
+        if len(values) >= window:
+            strided = sliding_window_view(values[:, :, features.index(name)], window, axis=0)
+            column[window - 1:] = getattr(strided, func)(axis=-1)
+        out.append(column)
+        names.append('%s_%s%d'%(name, func, window))
+
+    if not out:
+        return np.empty(values.shape[:2] + (0,)), names
+    return np.stack(out, axis=-1), names
@@ -0,0 +1,126 @@
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from .panel import StationPanel
+
+class GapIndex():
+    """This class keeps the run-length encoded null gaps of every station and feature of a
+    StationPanel, with their yearly coverage, so that stations can be selected on the
+    density of their records without scanning the data again."""
+
+    def __init__(self, index, codes, features, arrays):
+        """*index*, *codes* and *features* are those of the panel and *arrays* the
+        dictionary of arrays computed by `_gap_arrays`."""
+
+        self.index = index
+        self.codes = codes
+        self.features = pd.Index(features)
+        self.years = pd.Index(arrays['years'], name='Year')
+        self.rows = pd.Series(arrays['rows'], index=self.years)
+
+        feature_idx, code_idx = arrays['gap_feature'], arrays['gap_code']
+        self.gaps = pd.DataFrame({'Feature': pd.Categorical.from_codes(feature_idx, self.features),
+                                  'Code': pd.Categorical.from_codes(code_idx, codes),
+                                  'Start': index[arrays['gap_start']],
+                                  'End': index[arrays['gap_end'] - 1],
+                                  'Length': arrays['gap_end'] - arrays['gap_start'],
+                                  'StartYear': self.years[arrays['gap_start_year']],
+                                  'EndYear': self.years[arrays['gap_end_year']]})
+
+        columns = pd.MultiIndex.from_product([self.features, codes], names=['Feature', codes.name or 'Code'])
+        # counts year x station x feature -> year x (feature, station)
+        counts = arrays['counts'].transpose(0, 2, 1).reshape(len(self.years), -1)
+        self.counts = pd.DataFrame(counts, index=self.years, columns=columns)
+
+        n_gaps = np.bincount(feature_idx * len(codes) + code_idx, minlength=columns.size)
+        longest = np.zeros(columns.size, dtype=np.int64)
+        np.maximum.at(longest, feature_idx * len(codes) + code_idx, self.gaps['Length'].to_numpy())
+        first, last = arrays['first'].T.ravel(), arrays['last'].T.ravel()
+        valid = first >= 0
+        self.summary = pd.DataFrame({'First': index[np.where(valid, first, 0)].where(valid),
+                                     'Last': index[np.where(valid, last, 0)].where(valid),
+                                     'Valid': counts.sum(axis=0),
+                                     'Gaps': n_gaps,
+                                     'LongestGap': longest}, index=columns)
+        self.summary['Coverage'] = self.summary['Valid'] / np.where(valid, last - first + 1, 1)
+
+    @classmethod
+    def from_panel(cls, panel, cache='./data/cache/gaps'):
+        """Builds the index of *panel* (a StationPanel or a list of station dictionaries).
+        The arrays are kept in the directory *cache* (if not None) under a hash of the
+        null mask of the panel, so that an unchanged panel is not scanned again."""
+
+        if not isinstance(panel, StationPanel):
+            panel = StationPanel.from_stations(panel)
+        mask = np.isnan(panel.values)
+
+        file = None
+        if cache is not None:
+            digest = hashlib.sha1(np.packbits(mask).tobytes())
+            digest.update(repr((mask.shape, list(panel.index.astype(str)), list(panel.codes), list(panel.features))).encode())
+            file = os.path.join(cache, digest.hexdigest() + '.npz')
+
+        if file is not None and os.path.exists(file):
+            with np.load(file) as data:
+                arrays = dict(data)
+        else:
+            arrays = _gap_arrays(mask, panel.index.year)
+            if file is not None:
+                os.makedirs(cache, exist_ok=True)
+                np.savez(file, **arrays)
+
+        return cls(panel.index, panel.codes, panel.features, arrays)
+
+    def coverage(self, feature=None):
+        """Returns a DataFrame year x station (x feature, if *feature* is None) with the
+        fraction of the periods of each year holding a valid record."""
+
+        counts = self.counts if feature is None else self.counts[feature]
+        return counts.div(self.rows, axis=0)
+
+    def query(self, feature, min_coverage=.95, max_gap=3, start=None, end=None):
+        """Returns the codes of the stations whose records of *feature*, over the years
+        *start* to *end* (all if None), cover at least *min_coverage* of the periods and
+        have no gap longer than *max_gap* periods (e.g. months)."""
+
+        rows = self.rows.loc[start:end]
+        coverage = self.counts[feature].loc[start:end].sum(axis=0) / max(rows.sum(), 1)
+
+        gaps = self.gaps[self.gaps['Feature'] == feature]
+        if start is not None:
+            gaps = gaps[gaps['EndYear'] >= start]
+        if end is not None:
+            gaps = gaps[gaps['StartYear'] <= end]
+        longest = gaps.groupby('Code', observed=False)['Length'].max().reindex(self.codes).fillna(0)
+
+        selected = (coverage.to_numpy() >= min_coverage) & (longest.to_numpy() <= max_gap)
+        return self.codes[selected]
+
+
+def _gap_arrays(mask, years):
+    """Computes on the null *mask* (time x station x feature) of a panel, whose rows fall
+    in the *years* given, the yearly counts of valid records, the first and last valid
+    row of each series (-1 if none) and its gaps: the runs of nulls between them."""
+
+    valid = ~mask
+    year_values, bounds = np.unique(np.asarray(years), return_index=True)
+    counts = np.add.reduceat(valid, bounds, axis=0) if len(mask) else np.zeros((0,) + mask.shape[1:], dtype=np.int64)
+    rows = np.diff(np.r_[bounds, len(mask)])
+
+    has_valid = valid.any(axis=0)
+    first = np.where(has_valid, valid.argmax(axis=0), -1)
+    last = np.where(has_valid, len(mask) - 1 - valid[::-1].argmax(axis=0), -1)
+
+    # station x feature x time, so that the runs come out ordered by series then time
+    t = np.arange(len(mask))
+    inner = np.moveaxis(mask, 0, -1) & (t > first[..., None]) & (t < last[..., None])
+    steps = np.diff(inner.astype(np.int8), axis=-1, prepend=0, append=0)
+    gap_code, gap_feature, gap_start = np.nonzero(steps == 1)
+    gap_end = np.nonzero(steps == -1)[2]
+
+    year_of_row = np.repeat(np.arange(len(year_values)), rows)
+    return {'years': year_values, 'rows': rows, 'counts': counts.astype(np.int64),
+            'first': first, 'last': last,
+            'gap_code': gap_code, 'gap_feature': gap_feature, 'gap_start': gap_start, 'gap_end': gap_end,
+            'gap_start_year': year_of_row[gap_start], 'gap_end_year': year_of_row[gap_end - 1]}
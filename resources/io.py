@@ -1,37 +1,22 @@
 import glob
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Polygon
 import re
 import pickle
+from functools import lru_cache
+from .profiling import profiled
 
-def read_heatspots_dataset(path='./data/heatspots_states_1998-2017.csv'):
-    
-    with open('./data/misc/months.txt', encoding='utf-8') as months:
-        months_map = dict(map(lambda x: (x[1].replace('\n',''), x[0]), enumerate(months.readlines(), 1)))
-
-    codes_map = pickle.load(open('./data/misc/st_codes.pkl', 'rb'))
-
-    data = pd.read_csv(path, encoding='utf-8', sep='\t', dtype={'Number':'str'}) \
-        .assign(Number = lambda df: df['Number'].apply(lambda x: int(x.replace('.','')))) \
-        .assign(St_codes = lambda df: df['State'].map(lambda x: codes_map[x.upper()])) \
-        .replace({'Month':months_map}) \
-        .drop('Period', axis=1) \
-        .assign(Date = lambda df: pd.PeriodIndex(year=df['Year'], month=df['Month'], freq='M')) \
-        .set_index('Date')
-    
-    return data.sort_index().drop_duplicates()
+_HEADER_MAX_LINES = 20
 
-def read_deforestation_dataset():
-    data = pd.read_csv('./data/deforestation.csv')
-    data.columns = data.columns.map(lambda x: x.capitalize())
-    return data
+_HEADER_FIELDS = {'Codigo Estacao': ('Code', str),
+    'Latitude': ('Latitude', float),
+    'Longitude': ('Longitude', float),
+    'Altitude': ('Height', float)}
 
-def import_table(path, period=None):
-    """this function import the contents of each climate station and outputs and dictionary
-    with leys corresponding to properties of the importated data."""
-    
-    feature_names = {'DIRECAO PREDOMINANTE DO VENTO, MENSAL(° (gr))': 'windDirection',
+_FEATURE_NAMES = {'DIRECAO PREDOMINANTE DO VENTO, MENSAL(° (gr))': 'windDirection',
     'EVAPORACAO DO PICHE, MENSAL(mm)': 'evaptransPiche',
     'EVAPOTRANSPIRACAO POTENCIAL, BH MENSAL(mm)': 'evaptransPot',
     'EVAPOTRANSPIRACAO REAL, BH MENSAL(mm)': 'evaptransReal',
@@ -50,62 +35,232 @@ def import_table(path, period=None):
     'VISIBILIDADE, MEDIA MENSAL(codigo)': 'visibility',
     'Unnamed: 17': 'avgAtmPressureSL',
     'Data Medicao': 'Date'}
-    
-    data = {}
-    with open(path, 'r+', encoding='cp1252') as file:
-        table_found = False
-        for counter, line in enumerate(file):
-            parsed_line = _parse_line_table(line)
-            if isinstance(parsed_line, dict):
-                data.update(parsed_line)
-            elif parsed_line:
-                skiprows = counter
-                table_found = parsed_line 
+
+@profiled
+def read_heatspots_dataset(path='./data/heatspots_states_1998-2017.csv'):
+    """Reads a tab separated heatspots counting (INPE export) with `Year`, `State`, `Month`
+    and `Number` fields into a DataFrame indexed by monthly periods. States and their
+    codes are categoricals, numbers are int32 and years int16."""
+
+    data = pd.read_csv(path, encoding='utf-8', sep='\t', thousands='.', usecols=lambda x: x != 'Period',
+                       dtype={'Year': 'int16', 'State': 'category', 'Month': 'category', 'Number': 'int32'}) \
+        .drop_duplicates()
+
+    codes_map = _codes_map()
+    data['Month'] = data['Month'].cat.rename_categories(_months_map()).astype('int8')
+    data['St_codes'] = data['State'].cat.rename_categories(lambda x: codes_map[x.upper()])
+    data.index = pd.PeriodIndex(pd.to_datetime(pd.DataFrame({'year': data['Year'], 'month': data['Month'], 'day': 1})), freq='M', name='Date')
+
+    return data.sort_index(kind='stable')
+
+@profiled
+def aggregate_heatspots(paths, aggregate=None, chunksize=10**6, date_field='datahora', state_field='estado',
+                        count_field=None, sep=',', date_format=None):
+    """Streams the raw heatspots exports in *paths* (a file or a list of files with one
+    row per detection, by default in the INPE `datahora`/`estado` layout) in chunks of
+    *chunksize* rows, counting detections per month and state. If *count_field* is given
+    its values are summed instead. Returns a DataFrame of counts indexed by monthly
+    periods with state codes as columns, added to *aggregate* if an earlier result is
+    given so that new files can be appended without reading the previous ones again.
+    Memory use depends on *chunksize* only."""
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    codes_map = _codes_map()
+    usecols = [date_field, state_field] + ([count_field] if count_field is not None else [])
+    total = aggregate.copy() if aggregate is not None else None
+
+    for path in paths:
+        for chunk in pd.read_csv(path, sep=sep, usecols=usecols, dtype={state_field: 'category'}, chunksize=chunksize):
+            dates = pd.PeriodIndex(pd.to_datetime(chunk[date_field], format=date_format), freq='M', name='Date')
+            states = chunk[state_field].map(lambda x: codes_map.get(x.upper(), x))
+            grouped = (chunk[count_field] if count_field is not None else pd.Series(1, index=chunk.index)) \
+                .groupby([dates, states.rename('St_codes')], observed=True).sum() \
+                .unstack(fill_value=0)
+            total = grouped if total is None else total.add(grouped, fill_value=0)
+
+    if total is None:
+        return pd.DataFrame(index=pd.PeriodIndex([], freq='M', name='Date'))
+    return total.fillna(0).astype('int64').sort_index().sort_index(axis=1)
+
+@lru_cache(maxsize=None)
+def _months_map(path='./data/misc/months.txt'):
+    """Maps the (portuguese) month names to their numbers, read once per session."""
+
+    with open(path, encoding='utf-8') as months:
+        return {line.rstrip('\n'): i for i, line in enumerate(months, 1)}
+
+@lru_cache(maxsize=None)
+def _codes_map(path='./data/misc/st_codes.pkl'):
+    """Maps the (upper case) state names to their codes, read once per session."""
+
+    return load_data(path)
+
+def read_deforestation_dataset():
+    data = pd.read_csv('./data/deforestation.csv')
+    data.columns = data.columns.map(lambda x: x.capitalize())
+    return data
+
+@profiled
+def import_table(path, period=None):
+    """this function import the contents of each climate station and outputs and dictionary
+    with leys corresponding to properties of the importated data."""
+
+    with open(path, 'rb') as file:
+        data = _import_station(file, period)
         print('{} read...'.format(path), end=' ')
-        
-    if table_found:
-        data['Data'] = pd.read_csv(path, sep=';', encoding='utf-8', skiprows=skiprows, index_col=0, parse_dates=[0], decimal=',', usecols=range(18))
-        data['Data'] = data['Data'].rename(feature_names, axis=1)
-        if period:
-            data['Data'].index = data['Data'].index.to_period(freq='M')
-            data['Data'].index.name = feature_names.get(data['Data'].index.name)
+
+    if 'Data' in data:
         print("Data collected successifully")
     else:
         print('')
-    
+
+    return data
+
+def _import_station(file, period=None):
+    """Parses an opened (binary) station file in a single pass: the metadata block is
+    read line by line until the table header is reached, then the remainder of the very
+    same handle is streamed into the csv engine."""
+
+    data = {}
+    for _ in range(_HEADER_MAX_LINES):
+        position = file.tell()
+        line = file.readline()
+        if not line:
+            break
+
+        parsed_line = _parse_line_table(line.decode('cp1252'))
+        if isinstance(parsed_line, dict):
+            data.update(parsed_line)
+        elif parsed_line:
+            file.seek(position)
+            data['Data'] = pd.read_csv(file, sep=';', encoding='utf-8', index_col=0, parse_dates=[0], decimal=',', usecols=range(18))
+            data['Data'] = data['Data'].rename(_FEATURE_NAMES, axis=1)
+            if period:
+                data['Data'].index = data['Data'].index.to_period(freq='M')
+                data['Data'].index.name = _FEATURE_NAMES.get(data['Data'].index.name)
+            break
+
+    return data
+
+@profiled
+def load_stations(pattern, workers=None, period=True, progress=None):
+    """Imports every station file matched by the glob *pattern* (or listed, if *pattern*
+    is a list of sources) over a pool of *workers* processes (all cores if None,
+    in-process if 1). Matched `.zip` archives are read member by member without
+    extraction. Returns a list of station dictionaries, in the same order as the sorted
+    sources and with the key `Source` added, and a dictionary of errors keyed by source.
+    *progress* is an optional callable taking the number of files done, the total and
+    the source just finished."""
+
+    sources = _list_sources(pattern) if isinstance(pattern, str) else list(pattern)
+    results, errors, done = [None] * len(sources), {}, []
+
+    def collect(i, task):
+        try:
+            results[i] = task()
+        except Exception as error:
+            errors[sources[i]] = '%s: %s'%(type(error).__name__, error)
+        if progress is not None:
+            progress(len(done) + 1, len(sources), sources[i])
+        done.append(i)
+
+    if workers == 1:
+        for i, source in enumerate(sources):
+            collect(i, lambda: _load_source(source, period))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_load_source, source, period): i for i, source in enumerate(sources)}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+
+    return [station for station in results if station is not None], errors
+
+def _list_sources(pattern):
+    """Expands *pattern* into a sorted list of station files, `.zip` archives being
+    expanded into `<archive>/<member>` entries for each of its csv members."""
+
+    sources = []
+    for path in sorted(glob.glob(pattern)):
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                sources.extend(path + '/' + name for name in sorted(archive.namelist()) if name.lower().endswith('.csv'))
+        else:
+            sources.append(path)
+    return sources
+
+def _load_source(source, period=None):
+    """Worker task for `load_stations`: imports a station file or a `<archive>/<member>` entry."""
+
+    archive, _, member = source.partition('.zip/')
+    if member:
+        with zipfile.ZipFile(archive + '.zip') as zf, zf.open(member) as file:
+            data = _import_station(file, period)
+    else:
+        with open(source, 'rb') as file:
+            data = _import_station(file, period)
+
+    data['Source'] = source
     return data
 
+@profiled
 def read_states_geometry(path):
     """Read multiple geometries into list of GeoSeries."""
+    import geopandas as gpd
+
     geos = []
     for file in glob.glob(path):
         geoseries = gpd.read_file(file, crs=4326)
-        geoseries['geometry'] = geoseries['geometry'].apply(lambda x: Polygon(x.coords))
+        geoseries['geometry'] = _lines_to_polygons(geoseries.geometry)
         geos.append(geoseries)
     
     return geos
 
+def read_states(path='./data/geojson/*.geojson', tolerance=None, cache='./data/cache/states.parquet'):
+    """Reads the state boundaries matched by *path* (the per-state files or a single merged
+    file) into one GeoDataFrame with a MultiPolygon per state code (`St_codes`). Geometries
+    are simplified at *tolerance* (degrees) if given. The result is kept in the GeoParquet
+    file *cache* (if not None), which is rebuilt only when any of the source files is newer."""
+    import geopandas as gpd
+    import shapely
 
-def _parse_line_table(string):
-    """this function parses the content of a string into predetermined kinds."""
+    files = sorted(glob.glob(path))
+    if not files:
+        raise FileNotFoundError("No state boundary files match %r."%path)
+    if cache is not None and os.path.exists(cache) and os.path.getmtime(cache) >= max(map(os.path.getmtime, files)):
+        states = gpd.read_parquet(cache)
+    else:
+        lines = pd.concat([gpd.read_file(file) for file in files], ignore_index=True)
+        codes, parts = np.unique(lines['Name'], return_inverse=True)
+        # parts of a state may overlap (e.g. RJ islands), hence the repair of the multipolygons
+        geometry = shapely.make_valid(shapely.multipolygons(_lines_to_polygons(lines.geometry), indices=parts))
+        states = gpd.GeoDataFrame({'St_codes': codes}, geometry=geometry, crs=4326)
+        if cache is not None:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            states.to_parquet(cache)
 
-    if re.match(r'Codigo Estacao', string):
-        value = convert_to_number(string.replace('\n',''), type=str)
-        return {'Code': str(value)}
-    
-    elif re.match(r'Latitude', string):
-        value = convert_to_number(string.replace('\n',''))
-        return {'Latitude': value}
+    if tolerance is not None:
+        states['geometry'] = states.geometry.simplify(tolerance)
+    return states
+
+def _lines_to_polygons(geometries):
+    """Converts closed LineStrings into Polygons in one vectorized step."""
+    import shapely
 
-    elif re.match(r'Longitude', string):
-        value = convert_to_number(string.replace('\n',''))
-        return {'Longitude': value}
+    coords, indices = shapely.get_coordinates(np.asarray(geometries), return_index=True)
+    return shapely.polygons(shapely.linearrings(coords, indices=indices))
+
+
+def _parse_line_table(string):
+    """this function parses the content of a string into predetermined kinds."""
 
-    elif re.match(r'Altitude', string):
-        value = convert_to_number(string.replace('\n', ''))
-        return {'Height': value}
+    key = string.split(':', 1)[0]
+    if key in _HEADER_FIELDS:
+        name, type = _HEADER_FIELDS[key]
+        return {name: convert_to_number(string.rstrip('\r\n'), type=type)}
 
-    elif re.match(r'Data Medicao', string):
+    elif string.startswith('Data Medicao'):
         return True
 
 def convert_to_number(string, type=float):
@@ -122,4 +277,5 @@ def dump_data(path, data):
 def load_data(path):
     """Load file storaged as binary (pickle)."""
 
-    return pickle.load(open(path, 'rb'))
+    with open(path, 'rb') as file:
+        return pickle.load(file)
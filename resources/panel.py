@@ -0,0 +1,75 @@
+from functools import cached_property
+import numpy as np
+import pandas as pd
+
+class StationPanel():
+    """This class stacks the records of many weather stations into a single array of
+    shape time x station x feature, alongside a metadata table of the stations."""
+
+    def __init__(self, values, index, metadata, features):
+        """*values* is the array time x station x feature, *index* the time index (rows),
+        *metadata* a DataFrame indexed by station code with `Latitude`, `Longitude` and
+        `Height` columns (stations) and *features* the feature names."""
+
+        self.values = values
+        self.values.flags.writeable = False
+        self.index = index
+        self.metadata = metadata
+        self.features = pd.Index(features)
+        self.codes = metadata.index
+
+    @classmethod
+    def from_stations(cls, data, features=None, dtype=np.float64):
+        """Builds the panel from a list of station dictionaries *data* (as returned by
+        `import_table` or `load_stations`). *features* defaults to all the fields found
+        and *dtype* may be set to `np.float32` to halve the memory footprint."""
+
+        data = [station for station in data if 'Data' in station]
+        frames = [station['Data'] for station in data]
+        if features is None:
+            features = sorted(set().union(*(frame.columns for frame in frames)))
+
+        index = frames[0].index.append([frame.index for frame in frames[1:]]).unique().sort_values()
+        index.name = frames[0].index.name
+
+        # feature-major memory layout: each feature is a contiguous time x station block
+        values = np.full((len(index), len(frames), len(features)), np.nan, dtype=dtype, order='F')
+        for j, frame in enumerate(frames):
+            rows = index.get_indexer(frame.index)
+            values[rows, j, :] = frame.reindex(columns=features).to_numpy(dtype=dtype)
+
+        metadata = pd.DataFrame({field: [station.get(field) for station in data]
+                                 for field in ['Latitude', 'Longitude', 'Height']},
+                                index=pd.Index([station['Code'] for station in data], name='Code'))
+        return cls(values, index, metadata, features)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def feature(self, name):
+        """Returns a DataFrame time x station of feature *name*. It is a read-only view on
+        the panel, `copy()` it before modifying values in place."""
+
+        k = self.features.get_loc(name)
+        return pd.DataFrame(self.values[:, :, k], index=self.index, columns=self.codes, copy=False)
+
+    def station(self, code):
+        """Returns a DataFrame time x feature with the records of station *code*."""
+
+        j = self.codes.get_loc(code)
+        return pd.DataFrame(self.values[:, j, :], index=self.index, columns=self.features, copy=False)
+
+    def null_counts(self):
+        """Returns a DataFrame feature x station with the number of null values."""
+
+        counts = np.isnan(self.values).sum(axis=0).T
+        return pd.DataFrame(counts, index=self.features, columns=self.codes)
+
+    @cached_property
+    def locations(self):
+        """GeoSeries of Point geometries of the stations indexed by their codes."""
+        import geopandas as gpd
+
+        return gpd.GeoSeries(gpd.points_from_xy(self.metadata['Longitude'], self.metadata['Latitude']),
+                             index=self.codes)
@@ -3,25 +3,39 @@ import matplotlib.gridspec as gridspec
 import pandas as pd
 import numpy as np
 import re
+import warnings
 import scipy.stats as stats
-from statsmodels.tsa.stattools import acf
 from matplotlib.ticker import AutoMinorLocator
-
-def streamplot(data, interval=None, marker=None, ax=None, **kwargs):
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+import matplotlib.dates as mdates
+from .panel import StationPanel
+from .correlation import acf
+from .profiling import profiled
+
+@profiled
+def streamplot(data, interval=None, marker=None, ax=None, fast=False, **kwargs):
     """Plots multiple streams (sequences) of a variable collected independently.
     The *data* is a DataFrame with columns as a series, or a list of series entirely
     where each series portrays a particular stream of the variable measured.
-    *Interval* accepted as input `[n]sigma` or `robust`."""
+    *Interval* accepted as input `[n]sigma` or `robust`. If *fast*, streams are
+    drawn as a single LineCollection decimated to the width of the axes in pixels
+    (see `_fast_streamplot`), for plotting hundreds of long streams."""
 
     ax_kwargs = {'color':'C0', 'alpha':.4}
     # ax_kwargs.update(**kwargs)
-   
+
+    if ax is None:
+        _, ax = plt.subplots()
+
+    if fast:
+        _fast_streamplot(data, interval, marker, ax, ax_kwargs, **kwargs)
+        _style_streamplot(ax)
+        return
+
     if isinstance(data, list):
         data = pd.concat(data, axis=1)
     xmin, xmax = data.index[0], data.index[-1]
- 
-    if ax is None:
-        _, ax = plt.subplots()
     
     if interval is not None:
 
@@ -47,15 +61,104 @@ def streamplot(data, interval=None, marker=None, ax=None, **kwargs):
         data.plot(ax=ax, lw=.8, **kwargs)
     
     ax.set_xlim(xmin, xmax)
+    _style_streamplot(ax)
+
+def _style_streamplot(ax):
     ax.grid(color='gray', lw=.5)
     ax.tick_params(axis='both', which='both', direction='in', length=6, top=True, right=True)
     ax.tick_params(axis='x', which='major', length=10)
 
-def parallelplot(df, category, centroids=False, interval=False, color=None, alpha=None, ax=None):
-    """Plot records of DataFrame *df* in parallel coordinates in accordance to the categoriacal field *category*."""
+def _fast_streamplot(data, interval, marker, ax, fill_kwargs, **kwargs):
+    """Rendering path of `streamplot` for many streams: the streams are gathered once
+    into a preallocated array (time x stream), the band statistics are computed in one
+    vectorized pass over it and, when there are more points than pixels, every stream
+    is reduced to the min/max of each pixel column before drawing."""
+
+    x, values, is_date = _stream_array(data)
+    n_pixels = max(int(ax.bbox.width), 1)
+
+    if interval is not None:
+        interval = _parse_interval(interval)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            central_line = np.nanmean(values, axis=1)
+            if interval[1].lower() == 'sigma':
+                n = 1 if interval[0] is None else int(interval[0])
+                sigma = np.nanstd(values, axis=1, ddof=1)
+                upper, lower = central_line + sigma * n, central_line - sigma * n
+            elif interval[1].lower() == 'robust':
+                upper, lower = np.nanquantile(values, [.95, .05], axis=1)
+
+        band = np.column_stack([central_line, upper, lower])
+        xs, band = _decimate(x, band, n_pixels)
+        ax.plot(xs, band[:, 0], color='k', lw=1.2, marker=marker, **kwargs)
+        ax.fill_between(xs, band[:, 1], band[:, 2], **fill_kwargs)
+
+    else:
+        xs, values = _decimate(x, values, n_pixels)
+        segments = np.stack(np.broadcast_arrays(xs[None, :], values.T), axis=-1)
+        colors = ['C%d'%(i % 10) for i in range(values.shape[1])]
+        ax.add_collection(LineCollection(segments, colors=colors, lw=.8, **kwargs))
+        ax.autoscale_view()
+
+    if is_date:
+        ax.xaxis_date()
+    ax.set_xlim(x[0], x[-1])
+
+def _stream_array(data):
+    """Returns the x coordinates (matplotlib date numbers for time indexes), a float array
+    time x stream of *data* (a DataFrame or a list of series on their joint index) and
+    whether the x coordinates are dates."""
+
+    if isinstance(data, list):
+        index = data[0].index.append([s.index for s in data[1:]]).unique().sort_values()
+        values = np.full((len(index), len(data)), np.nan)
+        for j, s in enumerate(data):
+            values[index.get_indexer(s.index), j] = s.to_numpy(dtype=float)
+    else:
+        index = data.index
+        values = data.to_numpy(dtype=float)
+
+    if isinstance(index, pd.PeriodIndex):
+        index = index.to_timestamp()
+    if isinstance(index, pd.DatetimeIndex):
+        return mdates.date2num(index.to_pydatetime()), values, True
+    return np.asarray(index, dtype=float), values, False
+
+def _decimate(x, values, n_buckets):
+    """Min/max decimation of the rows of *values* (time x stream) into *n_buckets* buckets
+    of consecutive points, each one drawn as its minimum then its maximum. Inputs with
+    fewer than twice as many points as buckets are returned as they are."""
+
+    n = len(x)
+    if n <= 2 * n_buckets:
+        return x, values
+
+    size = -(-n // n_buckets)
+    n_buckets = -(-n // size)
+    padded = np.full((n_buckets * size,) + values.shape[1:], np.nan)
+    padded[:n] = values
+    padded = padded.reshape((n_buckets, size) + values.shape[1:])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mins, maxs = np.nanmin(padded, axis=1), np.nanmax(padded, axis=1)
+    xs = np.asarray(x, dtype=float)
+    starts = xs[::size]
+    ends = xs[np.minimum(np.arange(1, n_buckets + 1) * size, n) - 1]
+
+    out_x = np.column_stack([starts, ends]).ravel()
+    out = np.stack([mins, maxs], axis=1).reshape((2 * n_buckets,) + values.shape[1:])
+    return out_x, out
+
+@profiled
+def parallelplot(df, category, centroids=False, interval=False, color=None, alpha=None, ax=None, max_lines=None, seed=None):
+    """Plot records of DataFrame *df* in parallel coordinates in accordance to the categoriacal field *category*.
+    Records are grouped once, each category being drawn as a single LineCollection of at most
+    *max_lines* records (randomly sampled with *seed* when there are more)."""
 
     fields = df.drop(category, axis=1).columns
-    cat_values = df[category].unique()
+    codes, cat_values = pd.factorize(df[category])
     xs = np.arange(len(fields))
     ymin, ymax = df.min().min() * 1.1, df.max().max() * 1.1
     lineHandle = []
@@ -65,15 +168,16 @@ def parallelplot(df, category, centroids=False, interval=False, color=None, alph
     ax.set_ylim(ymin, ymax)
 
     if centroids:
-        data = df.groupby(category).mean().reindex(cat_values).to_numpy()
+        grouped = df.groupby(category, sort=False)[list(fields)]
+        data = grouped.mean().reindex(cat_values).to_numpy()
         if interval == 'std':
-            std = df.groupby(category).std().reindex(cat_values)
+            std = grouped.std().reindex(cat_values)
             sup = data + std.to_numpy() * 1.96
             low = data - std.to_numpy() * 1.96
         if interval == 'robust':
-            pctl = df.groupby(category).apply(lambda s: s.quantile([.05, .95])).reindex(cat_values, level=0).swaplevel()
-            sup = pctl.loc[0.95, fields].to_numpy()
-            low = pctl.loc[0.05, fields].to_numpy()
+            pctl = grouped.quantile([.05, .95])
+            sup = pctl.xs(.95, level=-1).reindex(cat_values).to_numpy()
+            low = pctl.xs(.05, level=-1).reindex(cat_values).to_numpy()
 
         for i, ys in enumerate(data):
             line = ax.plot(xs, ys, color='k', lw=1.5, marker='s', mfc='C'+str(i), ms=7)
@@ -82,14 +186,25 @@ def parallelplot(df, category, centroids=False, interval=False, color=None, alph
                 ax.fill_between(xs, sup[i], low[i], alpha=alpha, lw=.5, color='C'+str(i))
 
     else:
-        data = [df[df[category] == value][fields].to_numpy() for value in cat_values]
-        for i, ys in enumerate(data):
-            lines = ax.plot(ys.T, color='C'+str(i), alpha=alpha)
-            lineHandle.append(lines[0])
+        # sort once and split the records into contiguous blocks, one per category
+        values = df[fields].to_numpy(dtype=float)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(cat_values) + 1))
+        rng = np.random.default_rng(seed)
+
+        for i in range(len(cat_values)):
+            idx = order[bounds[i]:bounds[i+1]]
+            if max_lines is not None and len(idx) > max_lines:
+                idx = np.sort(rng.choice(idx, max_lines, replace=False))
+            segments = np.stack(np.broadcast_arrays(xs[None, :], values[idx]), axis=-1)
+            lines = LineCollection(segments, colors='C'+str(i), alpha=alpha)
+            ax.add_collection(lines)
+            lineHandle.append(lines)
     
     for i in xs[1:-1]:
         ax.vlines(i, ymin, ymax, lw=.5)
     ax.set_xlim(xs.min(), xs.max())
+    ax.set_xticks(xs)
     ax.set_xticklabels(fields)
     ax.set_ylim(ymin, ymax)
     ax.legend(lineHandle, cat_values, title='Cluster')
@@ -109,10 +224,14 @@ def _parse_interval(interval):
             raise ValueError('Only [n]sigma or robust are valid inputs.')
     return match.groups()
 
+@profiled
 def plot_nullvalues(data, ax=None):
     """Plots a matrix for # of null on a grid of features x wheather station."""
 
-    df = pd.concat([station['Data'].isna().sum(axis=0).rename(station['Code']) for station in data], axis=1)
+    if isinstance(data, StationPanel):
+        df = data.null_counts()
+    else:
+        df = pd.concat([station['Data'].isna().sum(axis=0).rename(station['Code']) for station in data], axis=1)
     features = df.index
     codes = df.columns
 
@@ -126,6 +245,7 @@ def plot_nullvalues(data, ax=None):
     plt.xlabel('Station Code') 
     plt.colorbar()
 
+@profiled
 def decompositionplot(obj, trend=True, seasonal=True, residual=True, ax=None, title=None):
     """Plots optionally the `trend`, `seasonal`, and/or `residual` of an STL object or
     other with this same attributes containing sequences or arrays."""
@@ -185,6 +305,7 @@ def decompositionplot(obj, trend=True, seasonal=True, residual=True, ax=None, ti
             
     return fig.axes
 
+@profiled
 def boxplot(data, title=None, ax=None, custom_func='default', **kwargs):
     """Wrapper around matplotlib boxplot helper function with a optional argument
     for a callable for plot customization."""
@@ -229,12 +350,15 @@ def _custom_boxplot(plot):
         median.set_linewidth(1.5)
         median.set_color('lightblue')
 
-def scatterplot(df, x, y, col=None, legend=False, colorbar=False, legend_kwds=None, cbar_kwds=None, ax=None, **kwargs):
-    """This plotting function is streamlined for plotting on DataFrames."""
+@profiled
+def scatterplot(df, x, y, col=None, legend=False, colorbar=False, legend_kwds=None, cbar_kwds=None, ax=None, rasterized=False, **kwargs):
+    """This plotting function is streamlined for plotting on DataFrames. Points are
+    colored by the categories of the column *col* (if given) in a single scatter call,
+    which may be *rasterized* in vector outputs for very large number of points."""
 
-    kw = dict(cmap='tab10')
+    kw = dict(cmap='tab10', rasterized=rasterized)
     kw.update(**kwargs)
-    kw['c'] = getattr(df, kwargs['c']) if kwargs.get('c') else None
+    kw['c'] = df[kwargs['c']] if kwargs.get('c') else None
 
     if ax is None:
         _, ax = plt.subplots()
@@ -243,18 +367,27 @@ def scatterplot(df, x, y, col=None, legend=False, colorbar=False, legend_kwds=No
     ax.set_ylabel(y)
 
     if col in df.columns:
-        for i, value in enumerate(df[col].unique()):
-            _df = df.query("%s == @value"%col)
-            
-            if legend:
-                kw.update({'label': value})
-
-            ax.scatter(x=getattr(_df, x), y=getattr(_df, y), color=plt.get_cmap(kw['cmap'])(i), **kw)
-
-        ax.update_datalim(df[[x, y]].values)
+        codes, categories = pd.factorize(df[col])
+        # points drawn category after category, so that the last ones stay on top
+        order = np.argsort(codes, kind='stable')
+        order = order[codes[order] >= 0]
+        cmap = plt.get_cmap(kw.pop('cmap'))
+        colors = cmap(np.arange(len(categories)))
+        kw.pop('c')
+        kw.pop('label', None)
+
+        ax.scatter(x=df[x].to_numpy()[order], y=df[y].to_numpy()[order], color=colors[codes[order]], **kw)
+
+        if legend:
+            # proxies of the size of the points (*s* is an area), unless handles are given
+            markersize = np.sqrt(kw.get('s', plt.rcParams['lines.markersize']**2))
+            handles = [Line2D([], [], ls='', marker=kw.get('marker', 'o'), markersize=markersize, color=color,
+                              alpha=kw.get('alpha'), label=value)
+                       for value, color in zip(categories, colors)]
+            legend_kwds = {'handles': handles, **(legend_kwds or {})}
     
     else:
-        plot = ax.scatter(x=getattr(df, x), y=getattr(df, y), **kw)
+        plot = ax.scatter(x=df[x], y=df[y], **kw)
         
         if colorbar:
             if cbar_kwds is None:
@@ -269,10 +402,11 @@ def scatterplot(df, x, y, col=None, legend=False, colorbar=False, legend_kwds=No
     
     return ax
 
+@profiled
 def autocorrplot (series, nlags='auto', autocorr_fn=None, ax=None, **kwargs):
     """Plot the autocorrelation coefficients of a time series. *autocorr_fn* must
-    has *nlags* as parameter for number of lags to be computed. Default is same
-    as statsmodels."""
+    has *nlags* as parameter for number of lags to be computed. Default is the FFT
+    based `correlation.acf` (same results as statsmodels, skipping null values)."""
 
     plot_params = {'title': "Autocorrelation Plot",
               'alphas': [0.05, 0.01]}
@@ -284,8 +418,7 @@ def autocorrplot (series, nlags='auto', autocorr_fn=None, ax=None, **kwargs):
 
     assert nlags == 'auto' or (isinstance(nlags, int) and nlags > 0), "If not `auto` it must be a positive integer."
 
-    if nlags == 'auto':
-        nlags = len(autocoeff) + 1
+    nlags = len(autocoeff)
     if ax is None:
         _, ax = plt.subplots()
 
@@ -0,0 +1,76 @@
+import os
+import json
+import time
+import socket
+import tracemalloc
+from functools import wraps
+
+# the report file, set by `enable` or the environment variable RESOURCES_PROFILE
+_REPORT = os.environ.get('RESOURCES_PROFILE') or None
+_PEAKS = []
+
+def enable(path='./data/cache/profile.jsonl'):
+    """Starts recording the calls of the `profiled` functions into the file *path*."""
+
+    global _REPORT
+    _REPORT = path
+
+def disable():
+    """Stops recording calls."""
+
+    global _REPORT
+    _REPORT = None
+
+def profiled(func):
+    """Decorator recording, while profiling is enabled, the wall time and peak of memory
+    allocated (tracemalloc) by each call of *func* as a line of JSON appended to the
+    report: function, start time, seconds, peak bytes, host and process id. Nested
+    profiled calls are recorded too, the peak of the outer calls including theirs.
+    Tracing allocations slows the calls down; when disabled they go straight through."""
+
+    name = '%s.%s'%(func.__module__, func.__qualname__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _REPORT is None:
+            return func(*args, **kwargs)
+
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        current, peak = tracemalloc.get_traced_memory()
+        if _PEAKS:
+            _PEAKS[-1] = max(_PEAKS[-1], peak)
+        tracemalloc.reset_peak()
+        _PEAKS.append(0)
+
+        start, wall = time.time(), time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            wall = time.perf_counter() - wall
+            peak = max(_PEAKS.pop(), tracemalloc.get_traced_memory()[1])
+            if _PEAKS:
+                _PEAKS[-1] = max(_PEAKS[-1], peak)
+            if started:
+                tracemalloc.stop()
+            _record({'function': name, 'start': start, 'seconds': wall, 'peak_bytes': max(peak - current, 0),
+                     'host': socket.gethostname(), 'pid': os.getpid()})
+
+    return wrapper
+
+def read_report(path=None):
+    """Returns the records of the report *path* (the current one if None) as a DataFrame."""
+
+    import pandas as pd
+
+    return pd.read_json(path or _REPORT, lines=True)
+
+def _record(entry):
+    if _REPORT is None:
+        return
+    directory = os.path.dirname(_REPORT)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(_REPORT, 'a') as file:
+        file.write(json.dumps(entry) + '\n')
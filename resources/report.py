@@ -0,0 +1,126 @@
+import os
+import json
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+
+def render_figures(specs, path='./data/reports', formats=('png',), dpi=100, workers=None, force=False, progress=None):
+    """Renders a batch of figures headless (Agg backend) over a pool of *workers*
+    processes (all cores if None, in-process if 1) and writes them under *path* in each
+    of the *formats* (e.g. `png`, `svg`).
+
+    Each of the *specs* is a dictionary with the keys:
+        `name`: file name without extension, relative to *path* (e.g. `AM/avgTemp`);
+        `plot`: a function of `plotting` by name (e.g. `streamplot`) or a module level callable;
+        `args`, `kwargs`: the arguments of the plot (optional);
+        `rc`: matplotlib rc parameters, e.g. {'figure.figsize': (8, 4)} (optional).
+
+    A hash of the plot, its arguments and *dpi* is kept for each figure in the file
+    `manifest.json` under *path*, so that figures whose inputs did not change and whose
+    files exist are skipped unless *force*. Returns a dictionary of the files written
+    keyed by figure name and a dictionary of errors keyed by figure name. *progress* is
+    an optional callable taking the number of figures done, the total and the name."""
+
+    manifest_file = os.path.join(path, 'manifest.json')
+    manifest = {}
+    if os.path.exists(manifest_file):
+        with open(manifest_file) as file:
+            manifest = json.load(file)
+
+    tasks = []
+    for spec in specs:
+        digest = _spec_hash(spec, dpi)
+        files = [os.path.join(path, '%s.%s'%(spec['name'], fmt)) for fmt in formats]
+        if force or manifest.get(spec['name']) != digest or not all(map(os.path.exists, files)):
+            tasks.append((spec, files, digest))
+
+    rendered, errors, done = {}, {}, []
+
+    def collect(spec, files, digest, task):
+        try:
+            task()
+            rendered[spec['name']] = files
+            manifest[spec['name']] = digest
+        except Exception as error:
+            errors[spec['name']] = '%s: %s'%(type(error).__name__, error)
+            manifest.pop(spec['name'], None)
+        if progress is not None:
+            progress(len(done) + 1, len(tasks), spec['name'])
+        done.append(spec['name'])
+
+    if workers == 1:
+        for spec, files, digest in tasks:
+            collect(spec, files, digest, lambda: _render_figure(spec, files, dpi))
+    elif tasks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_render_figure, spec, files, dpi): (spec, files, digest)
+                       for spec, files, digest in tasks}
+            for future in as_completed(futures):
+                collect(*futures[future], future.result)
+
+    os.makedirs(path, exist_ok=True)
+    with open(manifest_file + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+    return rendered, errors
+
+def _render_figure(spec, files, dpi):
+    """Worker task for `render_figures`: draws the figure of *spec* and saves it to *files*
+    with the non-interactive Agg backend, whichever backend is active (the previous one
+    is restored afterwards, for in-process rendering)."""
+
+    import matplotlib.pyplot as plt
+    from . import plotting
+
+    plot = getattr(plotting, spec['plot']) if isinstance(spec['plot'], str) else spec['plot']
+    backend = plt.get_backend()
+    plt.switch_backend('Agg')
+    before = set(plt.get_fignums())
+    try:
+        with plt.rc_context(spec.get('rc', {})):
+            # a blank current figure, for plots drawing through pyplot rather than on new axes
+            plt.figure()
+            plot(*spec.get('args', ()), **spec.get('kwargs', {}))
+            fig = plt.gcf()
+            for file in files:
+                os.makedirs(os.path.dirname(file), exist_ok=True)
+                fig.savefig(file, dpi=dpi)
+    finally:
+        for num in set(plt.get_fignums()) - before:
+            plt.close(num)
+        if backend.lower() != 'agg':
+            plt.switch_backend(backend)
+
+def _spec_hash(spec, dpi):
+    """Hash of the plot, the data and parameters of a figure *spec* and the *dpi*."""
+
+    plot = spec['plot'] if isinstance(spec['plot'], str) else '%s.%s'%(spec['plot'].__module__, spec['plot'].__qualname__)
+    digest = hashlib.sha1(repr((plot, dpi, sorted(spec.get('rc', {}).items()))).encode())
+    for arg in list(spec.get('args', ())) + sorted(spec.get('kwargs', {}).items()):
+        _update_hash(digest, arg)
+    return digest.hexdigest()
+
+def _update_hash(digest, obj):
+    """Feeds *obj* to *digest*: pandas objects by values and index, arrays by their bytes."""
+
+    if isinstance(obj, tuple):
+        for item in obj:
+            _update_hash(digest, item)
+    elif isinstance(obj, (pd.Series, pd.DataFrame)):
+        digest.update(pd.util.hash_pandas_object(obj).to_numpy().tobytes())
+        if isinstance(obj, pd.DataFrame):
+            digest.update(repr(list(obj.columns)).encode())
+        else:
+            digest.update(repr(obj.name).encode())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.dtype.str, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, dict)) and any(isinstance(item, (pd.Series, pd.DataFrame, np.ndarray))
+                                               for item in (obj.values() if isinstance(obj, dict) else obj)):
+        for item in (sorted(obj.items()) if isinstance(obj, dict) else obj):
+            _update_hash(digest, item)
+    else:
+        digest.update(pickle.dumps(obj))
@@ -0,0 +1,89 @@
+import os
+import glob
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from .io import read_states
+
+class RegionIndex():
+    """This class keeps the prepared polygons of regions (states, biomes) so that any
+    number of points is assigned to its regions with one spatial query per kind of region."""
+
+    def __init__(self, regions):
+        """*regions* is a GeoDataFrame with `Kind` (e.g. `State` or `Biome`) and `Name`
+        columns. When regions of a kind overlap, points are assigned to the first one."""
+
+        self.regions = regions
+        self.geometries, self.names = {}, {}
+        for kind, group in regions.groupby('Kind', sort=False):
+            self.geometries[kind] = group.geometry.to_numpy()
+            self.names[kind] = group['Name'].to_numpy()
+            shapely.prepare(self.geometries[kind])
+
+    @classmethod
+    def from_files(cls, states='./data/geojson/*.geojson', biomes='./data/biomas.json'):
+        """Builds the index from the state boundaries matched by *states* and the biomes
+        in *biomes* (land biomes take precedence over the water bodies in it)."""
+
+        states = read_states(states, cache=None)
+        biomes = gpd.read_file(biomes)
+        biomes = biomes.iloc[np.argsort(biomes['cod_bioma'].str.endswith('agua').to_numpy(), kind='stable')]
+
+        regions = pd.concat([
+            gpd.GeoDataFrame({'Kind': 'State', 'Name': states['St_codes']}, geometry=states.geometry.to_numpy(), crs=4326),
+            gpd.GeoDataFrame({'Kind': 'Biome', 'Name': biomes['nom_bioma']}, geometry=biomes.geometry.to_numpy(), crs=4326)],
+            ignore_index=True)
+        return cls(regions)
+
+    @classmethod
+    def load(cls, cache='./data/cache/regions.parquet', states='./data/geojson/*.geojson', biomes='./data/biomas.json'):
+        """Same as `from_files`, but the prepared regions are kept in the (GeoParquet) file
+        *cache*, which is rebuilt only when any of the source files is newer."""
+
+        sources = glob.glob(states) + [biomes]
+        if os.path.exists(cache) and os.path.getmtime(cache) >= max(map(os.path.getmtime, sources)):
+            return cls(gpd.read_parquet(cache))
+
+        index = cls.from_files(states, biomes)
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        index.regions.to_parquet(cache)
+        return index
+
+    def assign(self, points):
+        """Returns a DataFrame, indexed as *points* (a GeoSeries or array of Point
+        geometries), with a column per kind of region holding the name of the region
+        containing each point (null if outside all of them)."""
+
+        index = points.index if isinstance(points, pd.Series) else None
+        geometries = np.asarray(points)
+        out = pd.DataFrame(index=index if index is not None else pd.RangeIndex(len(geometries)))
+
+        # the points go in the STR-tree so that the predicates are evaluated on the
+        # prepared polygons (a few) rather than on each of the points (many)
+        tree = shapely.STRtree(geometries)
+        for kind, regions in self.geometries.items():
+            region_idx, point_idx = tree.query(regions, predicate='intersects')
+            order = np.lexsort((region_idx, point_idx))
+            point_idx, region_idx = point_idx[order], region_idx[order]
+            first = np.unique(point_idx, return_index=True)[1]
+
+            names = np.full(len(geometries), None, dtype=object)
+            names[point_idx[first]] = self.names[kind][region_idx[first]]
+            out[kind] = names
+
+        return out
+
+
+def assign_regions(points, index=None):
+    """Assigns each of the *points* (e.g. from `extract_locations`) to the state and biome
+    containing it, see `RegionIndex.assign`. The default *index* is loaded once per session."""
+
+    if index is None:
+        index = _default_index()
+    return index.assign(points)
+
+@lru_cache(maxsize=None)
+def _default_index():
+    return RegionIndex.load()
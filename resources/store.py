@@ -0,0 +1,130 @@
+import os
+import zipfile
+import hashlib
+import pandas as pd
+from .io import load_stations, _list_sources
+
+class StationStore():
+    """This class keeps parsed stations on disk as one Parquet file per station plus a
+    small metadata table (code, location and signature of the source file), so that
+    stations and columns can be read selectively and only changed sources re-parsed."""
+
+    meta_fields = ['Code', 'Latitude', 'Longitude', 'Height', 'Source', 'Mtime', 'Hash']
+
+    def __init__(self, path):
+        """*path* is the directory holding the store, created if it does not exist."""
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def metadata(self):
+        """DataFrame with one row per stored station indexed by its code."""
+
+        file = os.path.join(self.path, 'metadata.parquet')
+        if not os.path.exists(file):
+            return pd.DataFrame(columns=self.meta_fields).set_index('Code')
+        return pd.read_parquet(file)
+
+    def save(self, stations):
+        """Stores the list of station dictionaries *stations* (as returned by `import_table`
+        or `load_stations`), replacing entries of same code."""
+
+        meta = self.metadata
+        for station in stations:
+            if 'Data' not in station:
+                continue
+
+            station['Data'].to_parquet(self._station_file(station['Code']))
+            source = station.get('Source')
+            signature = _source_signature(source) if source is not None else (None, None)
+            meta.loc[station['Code']] = [station.get('Latitude'), station.get('Longitude'), station.get('Height'), source, *signature]
+
+        self._write_metadata(meta)
+
+    def load(self, codes=None, columns=None):
+        """Returns a list of station dictionaries for the stations in *codes* (all if None)
+        reading only the *columns* given (all if None)."""
+
+        meta = self.metadata
+        if codes is not None:
+            meta = meta.loc[[str(code) for code in codes]]
+
+        return [{'Code': code,
+                 'Latitude': row['Latitude'],
+                 'Longitude': row['Longitude'],
+                 'Height': row['Height'],
+                 'Data': pd.read_parquet(self._station_file(code), columns=columns)}
+                for code, row in meta.iterrows()]
+
+    def update(self, pattern, workers=None, period=True):
+        """Imports the station files matched by *pattern* (see `load_stations`) which are
+        either not stored yet or whose source changed since stored. Returns the list of
+        codes updated and the dictionary of errors."""
+
+        stale = self.stale(_list_sources(pattern))
+        if not stale:
+            return [], {}
+
+        stations, errors = load_stations(stale, workers=workers, period=period)
+        self.save(stations)
+        return [station['Code'] for station in stations if 'Data' in station], errors
+
+    def stale(self, sources):
+        """Returns the *sources* not stored or which changed since stored. Modification
+        times are compared first and the content hash only when they differ."""
+
+        meta = self.metadata
+        stored = dict(zip(meta['Source'], zip(meta['Mtime'], meta['Hash'])))
+        refreshed = False
+        out = []
+        for source in sources:
+            if source not in stored:
+                out.append(source)
+                continue
+
+            mtime, digest = stored[source]
+            if _source_mtime(source) == mtime:
+                continue
+            if _source_signature(source)[1] != digest:
+                out.append(source)
+            else:
+                meta.loc[meta['Source'] == source, 'Mtime'] = _source_mtime(source)
+                refreshed = True
+
+        if refreshed:
+            self._write_metadata(meta)
+        return out
+
+    def _station_file(self, code):
+        return os.path.join(self.path, '%s.parquet'%code)
+
+    def _write_metadata(self, meta):
+        file = os.path.join(self.path, 'metadata.parquet')
+        meta.index.name = 'Code'
+        meta.astype({'Latitude': float, 'Longitude': float, 'Height': float, 'Mtime': float}) \
+            .to_parquet(file + '.tmp')
+        os.replace(file + '.tmp', file)
+
+
+def _source_mtime(source):
+    """Modification time of a station file or of a `<archive>.zip/<member>` entry."""
+
+    archive, _, member = source.partition('.zip/')
+    if member:
+        with zipfile.ZipFile(archive + '.zip') as zf:
+            return float(pd.Timestamp(*zf.getinfo(member).date_time).timestamp())
+    return os.stat(source).st_mtime
+
+def _source_signature(source):
+    """Returns the modification time and a content hash of *source*. Zip members are
+    hashed by their stored CRC to avoid decompressing them."""
+
+    archive, _, member = source.partition('.zip/')
+    if member:
+        with zipfile.ZipFile(archive + '.zip') as zf:
+            digest = '%08x'%zf.getinfo(member).CRC
+    else:
+        with open(source, 'rb') as file:
+            digest = hashlib.md5(file.read()).hexdigest()
+    return _source_mtime(source), digest
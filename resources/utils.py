@@ -1,44 +1,87 @@
 import pandas as pd
 import numpy as np
 from collections import Counter
-from shapely.geometry import Point
-import geopandas as gpd
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from .panel import StationPanel
+from .profiling import profiled
+
+_RESAMPLING_METHODS = ('iid', 'moving', 'circular', 'stationary', 'seasonal')
 
 class Bootstrap():
     """This class provides bootstrap distribution of some statistics provided by a
     *attribute* of some *estimator*."""
 
-    def __init__(self, estimator, attributes, transformation=None, n_samples=1000):
+    def __init__(self, estimator, attributes=None, transformation=None, n_samples=1000, method='iid', block_size=12, workers=1, chunk_size=1000, n_inner=50):
         """*estimator* is a object with a `fit` method to collect the data to be
         processed into a statistics contained in *attribute*. *transformation*
         is a function to act on *attribute* to transform it into the desired
-        statistics."""
+        statistics. *estimator* may instead be a vectorized statistic taking the
+        data and an *axis* keyword (e.g. `np.mean`, `np.median` or `ols_slope`),
+        in which case resamples are evaluated all at once.
+
+        Resamples are drawn in chunks of *chunk_size*, each from its own random
+        stream, and spread over *workers* processes (estimator, attribute and
+        transformation must then be picklable). *n_inner* is the number of inner
+        resamples per resample used by the studentized interval.
+
+        *method* sets how observations are resampled: `iid` (rows independently),
+        `moving` or `circular` (blocks of *block_size* consecutive rows, the latter
+        wrapping around the end), `stationary` (blocks of geometric length with mean
+        *block_size*) or `seasonal` (whole cycles of *block_size* rows aligned at the
+        first one, i.e. whole years of a monthly series starting in January; the last
+        partial year is drawn too, its missing months taken from another year). All but
+        `iid` keep the autocorrelation of time series within blocks."""
+
+        assert method in _RESAMPLING_METHODS, "Only %s are valid methods."%', '.join(_RESAMPLING_METHODS)
 
         self.est_class = estimator
         self.attrs = attributes
         self.n_samples = n_samples
         self.transform = transformation if transformation is not None else self._transform
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.n_inner = n_inner
+        self.method = method
+        self.block_size = block_size
+        self.vectorized = not hasattr(estimator, 'fit')
 
-    def feed(self, *args, alpha=0.05, **kwargs):
+    @profiled
+    def feed(self, *args, alpha=0.05, interval='percentile', **kwargs):
         """Takes as *args* amd **kwargs** the same arguments that serves as input to
         the `fit` method in the given *estimator*. *alpha* is the significance level
-        to be considered in the confidence interval."""
-        
-        self.results = []
+        to be considered in the confidence interval, and *interval* its kind, one of
+        `percentile`, `bca` or `studentized`."""
+
+        assert interval in ('percentile', 'bca', 'studentized'), "Only percentile, bca or studentized are valid intervals."
+
         self.alpha = alpha
+        self.interval = interval
+        args = [np.asarray(arg) for arg in args]
+        statistic = self._statistic()
 
-        if 'seed' in kwargs.keys():
-            np.random.seed(seed=kwargs.pop('seed'))
+        n_chunks = -(-self.n_samples // self.chunk_size)
+        seeds = np.random.SeedSequence(kwargs.pop('seed', None)).spawn(n_chunks)
+        sizes = [min(self.chunk_size, self.n_samples - i * self.chunk_size) for i in range(n_chunks)]
+        n_inner = self.n_inner if interval == 'studentized' else 0
+        sampler = partial(_draw_indices, method=self.method, block_size=self.block_size)
+        tasks = [(statistic, sampler, args, seed, size, n_inner) for seed, size in zip(seeds, sizes)]
 
-        for _ in range(self.n_samples):
-            bootstrap_args = self._bootstrap_data(*args, **kwargs)
-            est = self.est_class().fit(*bootstrap_args)
-            att = getattr(est, self.attrs)
-            self.results.append(self.transform(att))
-        
-        self._process_results()
-    
-    def _transform(self, arg):
+        if self.workers == 1:
+            chunks = [_bootstrap_chunk(*task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                chunks = list(executor.map(_bootstrap_chunk, *zip(*tasks)))
+
+        self.results = _squeeze(np.concatenate([chunk[0] for chunk in chunks]))
+        assert len(self.results) == self.n_samples, "The statistic must return one result per resample."
+        if n_inner:
+            self.inner_se = _squeeze(np.concatenate([chunk[1] for chunk in chunks]))
+
+        self._process_results(args, statistic)
+
+    @staticmethod
+    def _transform(arg):
         return arg
 
     def summary(self):
@@ -48,24 +91,150 @@ class Bootstrap():
         outstring += '%10.3f%20.3f%25.3F%10.3f'%(self.stat, self.se, *self.conf_int)
         return outstring    
 
-    def _bootstrap_data(self, *args, **kwargs):
-        """This is a basic function which returns a bootstrap dataset from *args*."""
+    def _statistic(self):
+        """Returns a picklable function of (*args*, *idx*) evaluating the statistic on each
+        resample given by the rows of the index matrix *idx*."""
 
-        n = len(args[0])
-        proxies = np.arange(len(args[0]))
-        bootstrap_sample_idx = np.random.choice(proxies, n, replace=True)
-        return [arg[bootstrap_sample_idx] for arg in args]
-    
-    def _process_results(self):
+        if self.vectorized:
+            return partial(_vectorized_statistic, self.est_class)
+        return partial(_estimator_statistic, self.est_class, self.attrs, self.transform)
+
+    def _process_results(self, args, statistic):
         alpha = self.alpha
-        self.stat = np.mean(self.results)
-        self.se = np.std(self.results)
-        self.conf_int = np.quantile(self.results, [alpha/2, 1-alpha/2])
+        results = self.results
+        self.stat = np.mean(results, axis=0)
+        self.se = np.std(results, axis=0)
+
+        if self.interval == 'percentile':
+            self.conf_int = np.quantile(results, [alpha/2, 1-alpha/2], axis=0)
+            return
+
+        n = len(args[0])
+        self.estimate = _squeeze(statistic(args, np.arange(n)[None, :]))[0]
+        if self.interval == 'bca':
+            import scipy.stats as stats
+
+            # bias correction and acceleration (from the jackknife) of the percentiles
+            # (the proportion is kept within the resolution of the resamples so that z0 is
+            # finite, and the acceleration is null when all the jackknife values are equal)
+            b = len(results)
+            z0 = stats.norm.ppf(np.clip(np.mean(results < self.estimate, axis=0), 1 / (b + 1), b / (b + 1)))
+            jack = _squeeze(statistic(args, _jackknife_indices(n)))
+            d = jack.mean(axis=0) - jack
+            den = 6 * ((d**2).sum(axis=0))**1.5
+            num = (d**3).sum(axis=0)
+            acc = np.divide(num, den, out=np.zeros(np.shape(num)), where=den > 0)
+            z = stats.norm.ppf([alpha/2, 1-alpha/2]).reshape((2,) + (1,) * (results.ndim - 1))
+            q = np.clip(stats.norm.cdf(z0 + (z0 + z) / (1 - acc * (z0 + z))), 0, 1)
+            self.conf_int = np.array([np.quantile(col, qs) for col, qs in zip(results.reshape(len(results), -1).T, q.reshape(2, -1).T)]).T \
+                .reshape(q.shape)
+        else:
+            t = (results - self.estimate) / self.inner_se
+            self.conf_int = self.estimate - np.quantile(t, [1-alpha/2, alpha/2], axis=0) * self.se
+
+
+def ols_slope(x, y, axis=-1):
+    """Vectorized slope of the ordinary least squares line of *y* on *x* along *axis*."""
+
+    x = x - x.mean(axis=axis, keepdims=True)
+    y = y - y.mean(axis=axis, keepdims=True)
+    return (x * y).sum(axis=axis) / (x * x).sum(axis=axis)
+
+def _vectorized_statistic(statistic, args, idx):
+    """Evaluates *statistic* on the resamples given by the rows of *idx* along `axis=1`.
+    Reducing `axis=1` of the (resample, observation, ...) data leaves the resamples on
+    the first axis of the output, where they are kept. Otherwise the statistic is taken
+    to prepend its own axes (as `np.quantile` with a list of quantiles does), as many as
+    the output has dimensions beyond those of the reduced data, and the resamples are
+    moved from right after them to the front."""
+
+    data = [arg[idx] for arg in args]
+    out = np.asarray(statistic(*data, axis=1))
+    if out.shape[0] == len(idx):
+        return out
+
+    axis = out.ndim - (data[0].ndim - 1)
+    assert 0 < axis < out.ndim and out.shape[axis] == len(idx), "The statistic must keep one output per resample."
+    return np.moveaxis(out, axis, 0)
+
+def _estimator_statistic(estimator, attributes, transformation, args, idx):
+    results = []
+    for row in idx:
+        att = getattr(estimator().fit(*[arg[row] for arg in args]), attributes)
+        results.append(transformation(att))
+    return np.asarray(results)
+
+def _bootstrap_chunk(statistic, sampler, args, seed, size, n_inner=0):
+    """Evaluates *statistic* on *size* resamples drawn by *sampler* from the random stream
+    *seed* and, if *n_inner*, the standard error of each of them from as many inner
+    resamples."""
+
+    rng = np.random.default_rng(seed)
+    n = len(args[0])
+    idx = sampler(rng, size, n)
+    results = statistic(args, idx)
+    if not n_inner:
+        return results, None
+
+    inner_se = [statistic(args, row[sampler(rng, n_inner, n)]).std(axis=0, ddof=1) for row in idx]
+    return results, np.asarray(inner_se)
+
+def _draw_indices(rng, size, n, method='iid', block_size=12):
+    """Returns a (*size*, *n*) index matrix whose rows are resamples of range(*n*) drawn
+    from the generator *rng* according to *method* (see `Bootstrap`)."""
+
+    if method == 'iid':
+        return rng.integers(0, n, size=(size, n))
+
+    b = min(block_size, n)
+    n_blocks = -(-n // b)
+    offsets = np.arange(b)
+
+    if method == 'moving':
+        starts = rng.integers(0, n - b + 1, size=(size, n_blocks))
+        return (starts[:, :, None] + offsets).reshape(size, -1)[:, :n]
+
+    if method == 'circular':
+        starts = rng.integers(0, n, size=(size, n_blocks))
+        return ((starts[:, :, None] + offsets) % n).reshape(size, -1)[:, :n]
+
+    if method == 'seasonal':
+        # the trailing partial cycle is drawn too, its offsets past the end being taken
+        # from a whole cycle drawn apart, so that rows stay aligned with the season
+        cycles = rng.integers(0, n_blocks, size=(size, n_blocks, 1))
+        whole = rng.integers(0, n // b, size=(size, n_blocks, 1))
+        idx = np.where(cycles * b + offsets < n, cycles * b + offsets, whole * b + offsets)
+        return idx.reshape(size, -1)[:, :n]
+
+    # stationary: a new block starts at each position with probability 1/block_size
+    positions = np.arange(n)
+    new_block = rng.random((size, n)) < 1 / block_size
+    new_block[:, 0] = True
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    starts = rng.integers(0, n, size=(size, n))
+    return (np.take_along_axis(starts, block_start, axis=1) + positions - block_start) % n
+
+def _jackknife_indices(n):
+    """Index matrix whose i-th row leaves out the i-th observation."""
+
+    idx = np.arange(n - 1)[None, :]
+    return idx + (idx >= np.arange(n)[:, None])
 
+def _squeeze(results):
+    """Reshapes the results of a statistic to (n_samples,) when they are scalars."""
 
+    results = results.reshape(len(results), -1)
+    return results[:, 0] if results.shape[1] == 1 else results
+
+
+@profiled
 def collect_features(data, feature, **kwargs):
     """Take from each DataFrame in *data* a series indexed by *feature* and stack
-    them altogether into a new DataFrame. Accepts same kwargs from pandas concat()."""
+    them altogether into a new DataFrame. Accepts same kwargs from pandas concat().
+    If *data* is a StationPanel a view with the station codes as columns is returned."""
+
+    if isinstance(data, StationPanel):
+        return data.feature(feature)
 
     df = pd.concat([station['Data'][feature] for station in data], axis=1, **kwargs)
     return df
@@ -83,7 +252,15 @@ def print_frequency(data, title=''):
 
 def extract_locations(data, primary_key=None):
     """Returns a GeoSeries of Point geometries contained in *data*."""
-    
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    if isinstance(data, StationPanel):
+        if primary_key is None:
+            return data.locations.reset_index(drop=True)
+        keys = data.codes if primary_key == 'Code' else data.metadata[primary_key]
+        return data.locations.set_axis(keys)
+
     assert all([{'Longitude', 'Latitude'} - set(station.keys()) == set() for station in data])
     points = [(i, Point(station['Longitude'], station['Latitude'])) for i, station in enumerate(data)]
     if primary_key is not None:
@@ -93,6 +270,9 @@ def extract_locations(data, primary_key=None):
 def extract_fields(data, exclude=()):
     """Return a tuple of all fields in the DataFrames within *data*."""
 
+    if isinstance(data, StationPanel):
+        return sorted(set(data.features) - set(exclude))
+
     features = set()
     for station in data:
         features = features | set(station['Data'].columns.tolist())
@@ -102,13 +282,124 @@ def create_df_from_pca(model, data, n_components=None):
     """Returns a DataFrame with columns corresponding to the coefficients from the
     principal component analysis."""
 
+    from sklearn.decomposition import PCA, IncrementalPCA
+
     if n_components is None:
         n_components = model.n_components_
-    
+
+    if isinstance(model, (PCA, IncrementalPCA)):
+        # linear projection on the first components only, rather than transforming on all of them
+        coeffs = (np.asarray(data, dtype=float) - model.mean_) @ model.components_[:n_components].T
+        if getattr(model, 'whiten', False):
+            coeffs /= np.sqrt(model.explained_variance_[:n_components])
+    else:
+        # any other fitted model with a `transform` method (e.g. a scaler and PCA pipeline,
+        # SparsePCA or FactorAnalysis, whose transforms are not plain projections)
+        coeffs = model.transform(data)[:, :n_components]
+
     columns = ['coeff_%d'%i for i in range(1, n_components + 1)]
-    return pd.DataFrame(model.transform(data)[:,:(n_components)], columns=columns)
+    return pd.DataFrame(coeffs, columns=columns)
 
 def summary_dataset(df):
+    """Returns a two-column text summary of DataFrame *df*: index span, entries, fields,
+    nulls, memory and data types alongside the descriptive statistics."""
+
+    span = None
+    if isinstance(df.index, pd.PeriodIndex) or isinstance(df.index, pd.DatetimeIndex):
+        span = (df.index.min(), df.index.max(), df.index.dtype)
+
+    return _render_summary(span, len(df), df.dtypes, df.isnull().sum().sum(), df.memory_usage().sum(), df.describe())
+
+class RunningSummary():
+    """This class accumulates the statistics rendered by `summary_dataset` over chunks of
+    a DataFrame (or months appended to it) in constant time per update: counts, nulls,
+    min/max, mean and variance (merged as in Welford/Chan) and quantiles approximated
+    from a uniform sample of bounded size per column."""
+
+    def __init__(self, sample_size=10000, seed=None):
+        """*sample_size* is the number of values kept per column for the quantiles, which
+        are exact until that many values were fed."""
+
+        self.sample_size = sample_size
+        self.rng = np.random.default_rng(seed)
+        self.span = None
+        self.entries = 0
+        self.memory = 0
+        self.dtypes = pd.Series(dtype=object)
+        self.nulls = {}
+        self.moments = {}
+        self.samples = {}
+
+    def update(self, df):
+        """Adds the rows of DataFrame *df* to the statistics."""
+
+        if isinstance(df.index, pd.PeriodIndex) or isinstance(df.index, pd.DatetimeIndex):
+            start, end = df.index.min(), df.index.max()
+            if self.span is not None:
+                start, end = min(start, self.span[0]), max(end, self.span[1])
+            self.span = (start, end, df.index.dtype)
+
+        self.entries += len(df)
+        self.memory += df.memory_usage().sum()
+        self.dtypes = pd.concat([self.dtypes, df.dtypes[~df.dtypes.index.isin(self.dtypes.index)]])
+        for column, nulls in df.isnull().sum().items():
+            self.nulls[column] = self.nulls.get(column, 0) + nulls
+
+        numeric = df.select_dtypes('number')
+        values = numeric.to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(valid, values, 0).sum(axis=0) / counts
+            m2 = np.where(valid, (values - means)**2, 0).sum(axis=0)
+        mins = np.where(valid, values, np.inf).min(axis=0)
+        maxs = np.where(valid, values, -np.inf).max(axis=0)
+
+        for j, column in enumerate(numeric.columns):
+            if counts[j]:
+                self._merge(column, counts[j], means[j], m2[j], mins[j], maxs[j], values[valid[:, j], j])
+        return self
+
+    def _merge(self, column, n_b, mean_b, m2_b, min_b, max_b, sample_b):
+        n_a, mean_a, m2_a, min_a, max_a = self.moments.get(column, (0, 0., 0., np.inf, -np.inf))
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self.moments[column] = (n, mean_a + delta * n_b / n, m2_a + m2_b + delta**2 * n_a * n_b / n,
+                                min(min_a, min_b), max(max_a, max_b))
+
+        # bottom-k sampling: keeping the values of the k smallest random keys is a uniform
+        # sample of everything fed so far, and merges by concatenation
+        keys, sample = self.samples.get(column, (np.empty(0), np.empty(0)))
+        keys = np.concatenate([keys, self.rng.random(len(sample_b))])
+        sample = np.concatenate([sample, sample_b])
+        if len(keys) > self.sample_size:
+            keep = np.argpartition(keys, self.sample_size)[:self.sample_size]
+            keys, sample = keys[keep], sample[keep]
+        self.samples[column] = (keys, sample)
+
+    def describe(self):
+        """Returns the statistics in the same layout as pandas `describe`."""
+
+        stats = {}
+        for column, dtype in self.dtypes.items():
+            if not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+                continue
+            if column not in self.moments:
+                stats[column] = [0] + [np.nan] * 7
+                continue
+
+            n, mean, m2, min_, max_ = self.moments[column]
+            quantiles = np.quantile(self.samples[column][1], [.25, .5, .75])
+            std = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+            stats[column] = [n, mean, std, min_, *quantiles, max_]
+        return pd.DataFrame(stats, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def summary(self):
+        """Renders the same text summary as `summary_dataset`."""
+
+        return _render_summary(self.span, self.entries, self.dtypes, sum(self.nulls.values()), self.memory, self.describe())
+
+def _render_summary(span, entries, dtypes, nulls, memory, statistics):
 
     def add_line(string, values, line_pattern='{:<15s}{:>20s}\n'):
         for value in values:
@@ -134,31 +425,31 @@ def summary_dataset(df):
     out += 'Data Set Summary'.center(35) + '\n'
     out = fill_line(out)
 
-    if isinstance(df.index, pd.PeriodIndex) or isinstance(df.index, pd.DatetimeIndex):
-        out = add_line(out, ('Starts at', str(df.index.min())))
-        out = add_line(out, ('Ends at', str(df.index.max())))
-        out = add_line(out, ('Type', str(df.index.dtype)))
+    if span is not None:
+        out = add_line(out, ('Starts at', str(span[0])))
+        out = add_line(out, ('Ends at', str(span[1])))
+        out = add_line(out, ('Type', str(span[2])))
     
-    out = add_line(out, ('Entries', str(len(df))))
+    out = add_line(out, ('Entries', str(entries)))
     
-    n_lines, fields_lines = multiline(', '.join(df.columns), 20)
+    n_lines, fields_lines = multiline(', '.join(dtypes.index), 20)
     
-    for values in zip(['Fields'+' ('+str(len(df.columns))+')']+['']*(n_lines-1), fields_lines):
+    for values in zip(['Fields'+' ('+str(len(dtypes))+')']+['']*(n_lines-1), fields_lines):
         out = add_line(out, values)
     
-    out = add_line(out, ('NULL ', str(df.isnull().sum().sum())))
-    out = add_line(out, ('Memory[KB]', str(round(df.memory_usage().sum()/(2**10),1))))
+    out = add_line(out, ('NULL ', str(nulls)))
+    out = add_line(out, ('Memory[KB]', str(round(memory/(2**10),1))))
     
     out = fill_line(out)
     out += 'Data Types'.center(35) + '\n'
     out = fill_line(out)
 
-    for values in (tuple(d.split()) for d in df.dtypes.to_string().split('\n')):
+    for values in (tuple(d.split()) for d in dtypes.to_string().split('\n')):
         out = add_line(out, values)
     
     # Statistics columh
     
-    col2_body = df.describe().round(1).to_string()
+    col2_body = statistics.round(1).to_string()
     line_width = len(col2_body.split('\n')[0])
     
     col2 = '' 
@@ -181,13 +472,36 @@ def summary_dataset(df):
 
     return out
 
+@profiled
 def get_peak_month(df, field):
     """Takes a time series indexed pandas DataFrame and return the month when
     **field** hat its peak value."""
 
-    series = df.assign(Year = lambda x: x.index.year,
-                     Month = lambda x: x.index.month) \
-             .pivot_table(index='Year', columns='Month', values = field) \
-             .apply(lambda s: np.nanargmax(list(s)) + 1, axis=1)
+    return get_peak_months(df[[field]])[field].rename(None)
+
+def get_peak_months(df):
+    """Takes a monthly time series indexed DataFrame with one series per column (e.g.
+    states or stations) and returns a DataFrame years x columns with the month when
+    each series peaked. Repeated months are averaged, missing months are ignored and
+    years without any value are null."""
+
+    # rows collapsed to monthly periods first, so that daily (or repeated) records of a
+    # month are averaged as pivot_table did
+    months = df.index.asfreq('M') if isinstance(df.index, pd.PeriodIndex) else pd.PeriodIndex(df.index, freq='M')
+    df = df.groupby(months).mean()
+    index = df.index
+
+    years = np.asarray(index.year)
+    first = years.min()
+    n_years = years.max() - first + 1
+
+    # one (years, 12, series) block filled once, missing months left as NaN
+    values = np.full((n_years, 12, df.shape[1]), np.nan)
+    values[years - first, np.asarray(index.month) - 1] = df.to_numpy(dtype=float)
+
+    missing = np.isnan(values)
+    peaks = np.where(missing, -np.inf, values).argmax(axis=1) + 1
+    peaks = pd.DataFrame(peaks, index=pd.period_range(str(first), periods=n_years, freq='Y'), columns=df.columns) \
+        .where(~missing.all(axis=1)).astype('Int64')
 
-    return pd.Series(series.values, index=pd.PeriodIndex(series.index, freq='A'))
+    return peaks[peaks.notna().any(axis=1)]